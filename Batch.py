@@ -0,0 +1,140 @@
+"""
+Scalar results of the ground curve for many cases at once
+All cases are evaluated together with array operations; the equilibrium
+points are found by bisection instead of one root finding per case.
+"""
+import inspect
+import numpy as np
+from Ground_Curve import Equilibrium, ground_curve, _aldrian, \
+    _displacement, _lining, _rock_mass
+
+
+PARAMETERS = tuple(inspect.signature(ground_curve).parameters)
+# names of the input values, in the order of ground_curve
+
+_HOURS = np.arange(1, 28 * 24)
+# [hours] - ages of the vertices of the nonlinear support line
+
+_BISECTIONS = 54
+# halvings of a support segment: 2 ** -54 is below the float resolution
+
+
+def _columns(cases, params):
+    """
+    The input values of all cases as 1D float arrays of equal length.
+    Values given as keywords take precedence over the columns of cases;
+    missing ones take the defaults of ground_curve.
+    """
+    names = ()
+    if cases is not None:
+        dtype_names = getattr(getattr(cases, 'dtype', None), 'names', None)
+        names = dtype_names or cases
+    defaults = inspect.signature(ground_curve).parameters
+    values = []
+    for name in PARAMETERS:
+        if name in params:
+            value = params[name]
+        elif name in names:
+            value = cases[name]
+        else:
+            value = defaults[name].default
+        values.append(np.atleast_1d(np.asarray(value, dtype=float)))
+    return dict(zip(PARAMETERS, np.broadcast_arrays(*values)))
+
+
+def _support_equilibrium(vertex, n_vertices, rock, nu, E):
+    """
+    Ground_Curve._support_equilibrium for arrays of cases. vertex(j) returns
+    the coordinates x [m], y [MPa] of the vertices j (one index per case)
+    of the support lines. The crossing segment is found by bisection over
+    the vertices and the point by bisection along the segment. Returns x
+    and y, NaN where the support line does not reach the ground curve.
+    """
+    def residual(x, y):
+        return _displacement(1000 * y, rock, nu, E) - x
+
+    lo = np.zeros(len(nu), dtype=int)
+    hi = np.full(len(nu), n_vertices - 1)
+    found = (residual(*vertex(lo)) >= 0) & (residual(*vertex(hi)) <= 0)
+    while np.any(hi - lo > 1):
+        mid = (lo + hi) // 2
+        up = residual(*vertex(mid)) >= 0
+        lo = np.where(up, mid, lo)
+        hi = np.where(up, hi, mid)
+
+    x0, y0 = vertex(lo)
+    x1, y1 = vertex(hi)
+    dx, dy = x1 - x0, y1 - y0
+    t_lo = np.zeros(len(nu))
+    t_hi = np.ones(len(nu))
+    for _ in range(_BISECTIONS):
+        t = (t_lo + t_hi) / 2
+        up = residual(x0 + t * dx, y0 + t * dy) >= 0
+        t_lo = np.where(up, t, t_lo)
+        t_hi = np.where(up, t_hi, t)
+    t = (t_lo + t_hi) / 2
+    return (np.where(found, x0 + t * dx, np.nan),
+            np.where(found, y0 + t * dy, np.nan))
+
+
+def ground_curve_batch(cases=None, **params):
+    """
+    Scalar results of ground_curve (the fields of Ground_Curve.Equilibrium)
+    for many cases, vectorized across the cases.
+    cases  - table of input values with the parameter names of ground_curve
+             as columns: a pandas DataFrame, a dict of arrays or a
+             structured array
+    params - input values as keywords (scalars or arrays), these take
+             precedence over the columns of cases
+    All inputs broadcast to one length; missing ones take the defaults of
+    ground_curve (advance_rate, tolerance and precision are accepted but do
+    not enter the scalar results). Returns a structured array with one
+    record per case and the fields p_cr [kPa], x_cr, u_im [m], r_pm [m],
+    u_io [m], x_int, y_int, x_int_el, y_int_el [m, MPa] and safety_factor;
+    the equilibrium points are NaN and the safety factor 0 where the
+    support does not reach the ground curve.
+    """
+    v = _columns(cases, params)
+    gamma, H, nu, E, D, c, phi = (v[name] for name in (
+        'gamma', 'H', 'nu', 'E', 'D', 'c', 'phi'))
+    f_ck, E_c, nu_c, t_c, dis_sup = (v[name] for name in (
+        'f_ck', 'E_c', 'nu_c', 't_c', 'dis_sup'))
+    n = len(gamma)
+    cases_ = np.arange(n)
+
+    with np.errstate(all='ignore'):
+        rock = _rock_mass(gamma, H, nu, E, D, c, phi, dis_sup)
+
+        def scl_vertex(j):
+            sigma, E_t = _aldrian(_HOURS[j], f_ck, E_c)
+            p_scmax, k_sc = _lining(sigma, E_t, nu_c, t_c, D)
+            return rock.u_io + p_scmax / k_sc, p_scmax
+
+        x_int, y_int = _support_equilibrium(scl_vertex, len(_HOURS), rock,
+                                            nu, E)
+
+        p_scmax_el, k_sc_el = _lining(f_ck, E_c, nu_c, t_c, D)
+        u_iy = rock.u_io + p_scmax_el / k_sc_el
+        x_support_el = np.stack([rock.u_io, u_iy, u_iy * 1.005], axis=1)
+        y_support_el = np.stack([np.zeros(n), p_scmax_el, p_scmax_el],
+                                axis=1)
+
+        def el_vertex(j):
+            return x_support_el[cases_, j], y_support_el[cases_, j]
+
+        x_int_el, y_int_el = _support_equilibrium(el_vertex, 3, rock, nu, E)
+        safety_factor = np.where(y_int_el > 0, p_scmax_el / y_int_el, 0)
+
+    results = np.empty(n, dtype=[(name, float)
+                                 for name in Equilibrium._fields])
+    results['p_cr'] = rock.p_cr
+    results['x_cr'] = rock.x_cr
+    results['u_im'] = rock.u_im
+    results['r_pm'] = rock.r_pm
+    results['u_io'] = rock.u_io
+    results['x_int'] = x_int
+    results['y_int'] = y_int
+    results['x_int_el'] = x_int_el
+    results['y_int_el'] = y_int_el
+    results['safety_factor'] = safety_factor
+    return results
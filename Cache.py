@@ -0,0 +1,347 @@
+"""
+Memoization of ground_curve results
+Results are kept in a least recently used cache bounded by the number of
+entries and their size in bytes. The keys are the input values quantized to
+a step per parameter (the step of the app's sliders), so that all requests
+within half a step share one entry.
+A StageGraph caches the intermediate results of a computation split into
+stages, so that only the stages affected by a changed input are recomputed.
+A DiskCache keeps results in files shared by all processes of a server.
+"""
+from collections import OrderedDict
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import numpy as np
+
+
+_MISSING = object()
+
+
+def nbytes(obj):
+    """approximate memory held by a result: the sum of its numpy arrays"""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (list, tuple)):
+        return sum(nbytes(v) for v in obj)
+    if isinstance(obj, dict):
+        return sum(nbytes(v) for v in obj.values())
+    if hasattr(obj, 'to_plotly_json'):
+        # plotly figures and dash components
+        return nbytes(obj.to_plotly_json())
+    if hasattr(obj, '__slots__'):
+        return sum(nbytes(getattr(obj, name, None))
+                   for name in obj.__slots__)
+    return sys.getsizeof(obj)
+
+
+class LRUCache:
+    """
+    Least recently used cache holding at most max_entries values of at most
+    max_bytes in total (as measured by sizeof). Counts hits, misses and
+    evictions; safe to share between the threads of a server.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=256 * 2 ** 20,
+                 sizeof=nbytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # would evict everything else and still not fit
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while (len(self._entries) > self.max_entries
+                   or self._bytes > self.max_bytes):
+                self._bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """counters and current size of the cache"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self._bytes}
+
+
+def private_directory(path):
+    """
+    create the directory path readable and writable only by the user, or
+    check that an existing one is owned by the user and not writable by
+    others; PermissionError if not
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    stat = os.stat(path)
+    if hasattr(os, 'getuid') and (stat.st_uid != os.getuid()
+                                  or stat.st_mode & 0o022):
+        raise PermissionError(f'{path} is owned by another user or '
+                              f'writable by others')
+
+
+class DiskCache:
+    """
+    Cache of values in the files of a directory, shared by all processes
+    using it (e.g. the workers of a server). Every value is a file named by
+    the hash of salt and its key; the files hold the values pickled with
+    protocol 5, which stores numpy arrays as their raw bytes. When a put
+    makes the files larger than max_bytes in total, the least recently
+    used ones are deleted. Files are written under a temporary name and
+    renamed, so no process ever reads a partial value; a file deleted by
+    another process is a miss. Since its files are unpickled, the
+    directory must be owned by the user and not writable by others
+    (PermissionError if not).
+    path      - directory of the files, created if missing (mode 0o700)
+    max_bytes - bound of the size of all files in path
+    salt      - makes the keys of different caches (or versions of the
+                code) in one directory distinct
+    """
+
+    def __init__(self, path, max_bytes=256 * 2 ** 20, salt=''):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.salt = salt
+        private_directory(path)
+        self.hits = self.misses = self.evictions = 0
+        # of this process
+
+    def _file_name(self, key):
+        digest = hashlib.sha256(repr((self.salt, key)).encode()).hexdigest()
+        return os.path.join(self.path, digest + '.pkl')
+
+    def _files(self):
+        """(last use, size, file name) of all values"""
+        files = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def __len__(self):
+        return len(self._files())
+
+    def get(self, key, default=None):
+        file_name = self._file_name(key)
+        try:
+            with open(file_name, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(file_name)  # last use, for the eviction
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        data = pickle.dumps(value, protocol=5)
+        if len(data) > self.max_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._file_name(key))
+
+        files = self._files()
+        size = sum(file[1] for file in files)
+        for _, file_size, file_name in sorted(files):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(file_name)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass  # evicted by another process
+            size -= file_size
+
+    def clear(self):
+        for _, _, file_name in self._files():
+            try:
+                os.remove(file_name)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """counters of this process and current size of the directory"""
+        files = self._files()
+        return {'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'entries': len(files),
+                'bytes': sum(file[1] for file in files)}
+
+
+class Tiered:
+    """
+    Caches tried in turn, e.g. an LRUCache of the process in front of a
+    DiskCache shared by all processes. A value found in a later cache is
+    also put into the ones before it; put stores into all.
+    """
+
+    def __init__(self, *caches):
+        self.caches = caches
+
+    def __len__(self):
+        return len(self.caches[-1])
+
+    def get(self, key, default=None):
+        for i, cache in enumerate(self.caches):
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                for front in self.caches[:i]:
+                    front.put(key, value)
+                return value
+        return default
+
+    def put(self, key, value):
+        for cache in self.caches:
+            cache.put(key, value)
+
+    def clear(self):
+        for cache in self.caches:
+            cache.clear()
+
+    def stats(self):
+        """stats of every cache, front first"""
+        return [cache.stats() for cache in self.caches]
+
+
+def quantize(values, steps):
+    """
+    Key of a dict of input values: every value given a step is replaced
+    by its number of steps, the others are kept as they are
+    """
+    return tuple((name, int(round(value / steps[name])))
+                 if name in steps and value is not None else (name, value)
+                 for name, value in values.items())
+
+
+def memoize(function, steps, cache=None):
+    """
+    function wrapped with a cache whose keys are its arguments quantized to
+    steps ({parameter name: step}). A miss calls function with the values
+    of the request; later requests within half a step of them get the same
+    result. The cache (an LRUCache by default) is the attribute .cache of
+    the wrapper.
+    """
+    signature = inspect.signature(function)
+    cache = LRUCache() if cache is None else cache
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = quantize(bound.arguments, steps)
+        result = cache.get(key)
+        if result is None:
+            result = function(*bound.args, **bound.kwargs)
+            cache.put(key, result)
+        return result
+
+    wrapper.cache = cache
+    return wrapper
+
+
+class StageGraph:
+    """
+    Computation split into stages, each a function of some input values and
+    of the results of its upstream stages (like Ground_Curve.STAGES). The
+    result of every stage is cached under the input values it depends on,
+    directly or through its upstream stages, quantized to steps. Changing
+    one input value therefore only recomputes the stages downstream of it.
+    stages      - dict name -> (function, parameters, upstream) in the order
+                  of computation; function is called with its parameters
+                  and the results of its upstream stages as keywords
+    defaults    - input values used where a call does not give them
+    max_entries - bound of the LRUCache of every stage ...
+    max_bytes   - ... and of its size
+    """
+
+    def __init__(self, stages, steps=None, defaults=None, max_entries=16,
+                 max_bytes=64 * 2 ** 20):
+        self.stages = stages
+        self.steps = steps or {}
+        self.defaults = defaults or {}
+        self.caches = {name: LRUCache(max_entries, max_bytes)
+                       for name in stages}
+        self.dependencies = {}
+        for name, (_, parameters, upstream) in stages.items():
+            names = set(parameters)
+            for up in upstream:
+                names.update(self.dependencies[up])
+            self.dependencies[name] = tuple(sorted(names))
+        # input values every stage depends on
+        self.computed = ()
+        # stages computed (not served from cache) by the last call
+
+    def __call__(self, names=None, **values):
+        """
+        Results of the stages names (all by default) for the input values
+        as a dict name -> result
+        """
+        values = dict(self.defaults, **values)
+        results = {}
+        computed = []
+
+        def result(name):
+            if name not in results:
+                function, parameters, upstream = self.stages[name]
+                cache = self.caches[name]
+                key = quantize({p: values[p]
+                                for p in self.dependencies[name]},
+                               self.steps)
+                value = cache.get(key, _MISSING)
+                if value is _MISSING:
+                    value = function(**{p: values[p] for p in parameters},
+                                     **{up: result(up) for up in upstream})
+                    cache.put(key, value)
+                    computed.append(name)
+                results[name] = value
+            return results[name]
+
+        for name in self.stages if names is None else names:
+            result(name)
+        self.computed = tuple(computed)
+        return results
+
+    def clear(self):
+        for cache in self.caches.values():
+            cache.clear()
+
+    def stats(self):
+        """counters and size of the cache of every stage"""
+        return {name: cache.stats() for name, cache in self.caches.items()}
@@ -1,8 +1,152 @@
 # -*- coding: utf-8 -*-
-from plotly import tools
-import plotly.graph_objs as go
+import plotly.io as pio
+import numpy as np
 
 
+LAYOUT = dict(
+    plot_bgcolor='#f9f7f7',
+    showlegend=True,
+    margin=dict(
+        l=10,
+        r=50,
+        b=50,
+        t=50,
+        pad=4
+    ),
+    title=dict(
+        font=dict(size=20),
+    ),
+    hovermode='closest',
+    autosize=True,
+    width=1200,
+    height=800,
+    xaxis=dict(
+        rangemode='normal',
+        title=dict(text='Tunnel Wall Displacement [m]'),
+        tickformat='.3f',
+        domain=[0, 0.47],
+        anchor='y2',
+        zeroline=True, zerolinewidth=1, zerolinecolor='black'
+    ),
+    yaxis=dict(
+        scaleratio=0.1,
+        tickformat='.2f',
+        title=dict(text='Support Pressure [MPa]', font=dict(size=14)),
+        domain=[0.55, 1],
+        zeroline=True, zerolinewidth=1, zerolinecolor='black'
+    ),
+    xaxis2=dict(
+        title=dict(text='Time [days]'),
+        tickformat='.2f',
+        domain=[0.55, 1],
+        anchor='y4',
+        zeroline=True, zerolinewidth=1, zerolinecolor='black'
+    ),
+    yaxis2=dict(
+        title=dict(text='Distance from Tunnel Face [m]'),
+        tickformat='.2f',
+        anchor='x',
+        range=[80, -25],
+        domain=[0, 0.50],
+        zeroline=True, zerolinewidth=1, zerolinecolor='black'
+    ),
+    yaxis3=dict(
+        title=dict(text='Support Pressure [MPa]'),
+        tickformat='.2f',
+        domain=[0.55, 1],
+        anchor='x2',
+        rangemode='nonnegative',
+        zeroline=True, zerolinewidth=1, zerolinecolor='black'
+    ),
+    yaxis4=dict(
+        title=dict(text='Stress SpC [MPa]'),
+        tickformat='.2f',
+        domain=[0, 0.50],
+        anchor='x2',
+        rangemode='nonnegative',
+        zeroline=True, zerolinewidth=1, zerolinecolor='black'
+    ),
+    legend=dict(
+        traceorder='normal',
+        font=dict(
+            family='arial',
+            size=12,
+            color='#000'
+        ),
+        bgcolor='#E2E2E2',
+        bordercolor='#FFFFFF',
+        borderwidth=1.5
+    ),
+    template=pio.templates[pio.templates.default].to_plotly_json(),
+)
+# layout of every figure of draw, which only adds the ranges of the data and
+# the shapes; built once and shared by all figures, so it must not be changed
+
+
+def _lttb(x, y, n_out):
+    """
+    Indices of n_out points of the curve x, y chosen by Largest Triangle
+    Three Buckets (S. Steinarsson): the end points and, from every bucket
+    of the points in between, the one spanning the largest triangle with
+    the point chosen before it and the mean of the next bucket
+    """
+    n = len(x)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # means of all buckets, the last point standing for the one after them
+    size = np.diff(edges)
+    x_mean = (np.add.reduceat(x[:-1], edges[:-1]) / size).tolist() + [x[-1]]
+    y_mean = (np.add.reduceat(y[:-1], edges[:-1]) / size).tolist() + [y[-1]]
+    x, y, edges = x.tolist(), y.tolist(), edges.tolist()
+    chosen = [0]
+    for j in range(n_out - 2):
+        lo, hi = edges[j], edges[j + 1]
+        x_next, y_next = x_mean[j + 1], y_mean[j + 1]
+        x_a, y_a = x[chosen[-1]], y[chosen[-1]]
+        best, largest = lo, -1.
+        for i in range(lo, hi):
+            area = abs((x_a - x_next) * (y[i] - y_a)
+                       - (x_a - x[i]) * (y_next - y_a))
+            if area > largest:
+                best, largest = i, area
+        chosen.append(best)
+    chosen.append(n - 1)
+    return chosen
+
+
+def _downsample_indices(x, y, max_points=None, keep=()):
+    """indices of the points of downsample, None if the curve is kept as
+    it is"""
+    if max_points is None or x is None or len(x) <= max_points:
+        return None
+    x, y = np.asarray(x), np.asarray(y)
+    if not (np.isfinite(x).all() and np.isfinite(y).all()):
+        return None
+    bounds = sorted({0, len(x) - 1, *(int(i) % len(x) for i in keep)})
+    indices = [0]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        n_out = max(2, round((hi - lo) / (len(x) - 1) * max_points))
+        if hi - lo + 1 <= n_out:
+            part = range(hi - lo + 1)
+        else:
+            part = _lttb(x[lo:hi + 1], y[lo:hi + 1], n_out)
+        indices.extend(lo + i for i in part[1:])
+    return indices
+
+
+def downsample(x, y, max_points=None, keep=()):
+    """
+    The curve x, y reduced to about max_points points which look the same
+    when plotted (Largest Triangle Three Buckets). The end points and the
+    points of the indices keep are kept exactly; the stretches between them
+    get points in proportion to their length. Curves of at most max_points
+    points, with non-finite values or without max_points are returned as
+    they are.
+    """
+    indices = _downsample_indices(x, y, max_points, keep)
+    if indices is None:
+        return x, y
+    return np.asarray(x)[indices], np.asarray(y)[indices]
+
 
 def draw(x1, y1,
          x2, y2,
@@ -16,8 +160,23 @@ def draw(x1, y1,
          x8=None, y8=None,
          x9=None, y9=None,
          x10=None, y10=None,
-         x11=None, y11=None):
-    trace0 = go.Scatter(
+         x11=None, y11=None,
+         max_points=None):
+    # the figure as a plain dict (data and layout) on the template LAYOUT:
+    # plotly's graph objects would validate every property of every call
+    # about max_points points per trace (all if None), the samples of the
+    # ground curve next to the critical point and the equilibrium included
+    keep = [np.argmin(np.abs(np.asarray(y1) - v))
+            for v in (*(y11 if y11 is not None else ()), *y3)]
+    x1, y1 = downsample(x1, y1, max_points, keep)
+    x4, y4 = downsample(x4, y4, max_points)
+    x7, y7 = downsample(x7, y7, max_points)
+    x8, y8 = downsample(x8, y8, max_points)
+    x9, y9 = downsample(x9, y9, max_points)
+    x10, y10 = downsample(x10, y10, max_points)
+
+    trace0 = dict(
+        type='scatter',
         x=x1,
         y=y1,
         mode='lines',
@@ -25,11 +184,12 @@ def draw(x1, y1,
         line=dict(
             color='blue'
         ),
-        xaxis='x1',
-        yaxis='y1'
+        xaxis='x',
+        yaxis='y'
     )
 
-    trace1 = go.Scatter(
+    trace1 = dict(
+        type='scatter',
         x=x2,
         y=y2,
         mode='lines',
@@ -37,11 +197,12 @@ def draw(x1, y1,
         line=dict(
             color='red'
         ),
-        xaxis='x1',
-        yaxis='y1'
+        xaxis='x',
+        yaxis='y'
     )
 
-    trace2 = go.Scatter(
+    trace2 = dict(
+        type='scatter',
         x=x3,
         y=y3,
         mode='markers',
@@ -50,11 +211,12 @@ def draw(x1, y1,
             size=7,
             color='green'
         ),
-        xaxis='x1',
-        yaxis='y1'
+        xaxis='x',
+        yaxis='y'
     )
 
-    trace3 = go.Scatter(
+    trace3 = dict(
+        type='scatter',
         x=x4,
         y=y4,
         mode='lines',
@@ -64,7 +226,7 @@ def draw(x1, y1,
             width=1.5,
             dash='dashdot'
         ),
-        xaxis='x1',
+        xaxis='x',
         yaxis='y2'
     )
 
@@ -73,30 +235,37 @@ def draw(x1, y1,
     shapes = list()  # append the vertical lines later
 
     if flag is not None:
-        for index, item in enumerate(x6):
-            if index % 30 == 0:
-                trace5 = go.Scatter(
-                    x=item,
-                    y=y6,
-                    mode='lines',
-                    line=dict(
-                        color='gray',
-                        width=1,
-                        dash='dashdot'
-                    ),
-                    visible=True,  # 'legendonly' displays only in legend
-                    showlegend=False,
-                    legendgroup="group",
-                    hoverinfo='none',
-                    name='Diff. p_i',
-                    opacity=0.4,
-                    xaxis='x1',
-                    yaxis='y2'
-                )
-                data.append(trace5)
+        # the profiles of the family share the distances y6: the points
+        # chosen on the last profile serve them all
+        rows = _downsample_indices(x6[-1], y6, max_points)
+        if rows is None:
+            rows = slice(None)
+        y6 = np.asarray(y6)[rows]
+        for item in x6[::30][:, rows]:
+            trace5 = dict(
+                type='scatter',
+                x=item,
+                y=y6,
+                mode='lines',
+                line=dict(
+                    color='gray',
+                    width=1,
+                    dash='dashdot'
+                ),
+                visible=True,  # 'legendonly' displays only in legend
+                showlegend=False,
+                legendgroup="group",
+                hoverinfo='none',
+                name='Diff. p_i',
+                opacity=0.4,
+                xaxis='x',
+                yaxis='y2'
+            )
+            data.append(trace5)
 
-        trace5 = go.Scatter(
-            x=x6[-1],
+        trace5 = dict(
+            type='scatter',
+            x=x6[-1][rows],
             y=y6,
             mode='lines',
             line=dict(
@@ -110,7 +279,7 @@ def draw(x1, y1,
             hoverinfo='none',
             name='Diff. p_i',
             opacity=1,
-            xaxis='x1',
+            xaxis='x',
             yaxis='y2'
         )
         data.append(trace5)
@@ -118,7 +287,7 @@ def draw(x1, y1,
         # vertical lines
         for i in (x2[0], x3[0]):
             shapes.append({'type': 'line',
-                           'xref': 'x1',
+                           'xref': 'x',
                            'yref': 'y2',
                            'x0': i,
                            'y0': 0,
@@ -131,7 +300,8 @@ def draw(x1, y1,
                            'opacity' : 0.6
                            })
 
-        trace6 = go.Scatter(
+        trace6 = dict(
+            type='scatter',
             x=x7,
             y=y7,
             mode='lines',
@@ -140,12 +310,13 @@ def draw(x1, y1,
                 color='red',
                 width=2
             ),
-            xaxis='x1',
+            xaxis='x',
             yaxis='y2'
         )
         data.append(trace6)
 
-    trace7 = go.Scatter(
+    trace7 = dict(
+        type='scatter',
         x=x8,
         y=y8,
         mode='lines',
@@ -158,7 +329,8 @@ def draw(x1, y1,
         # showlegend=False,
     )
 
-    trace8 = go.Scatter(
+    trace8 = dict(
+        type='scatter',
         x=x9,
         y=y9,
         mode='lines',
@@ -170,7 +342,8 @@ def draw(x1, y1,
         yaxis='y4'
     )
 
-    trace9 = go.Scatter(
+    trace9 = dict(
+        type='scatter',
         x=x10,
         y=y10,
         mode='lines',
@@ -184,7 +357,8 @@ def draw(x1, y1,
         # hoverinfo='x+y'
     )
 
-    trace10 = go.Scatter(
+    trace10 = dict(
+        type='scatter',
         x=x11,
         y=y11,
         mode='markers',
@@ -192,89 +366,16 @@ def draw(x1, y1,
         line=dict(
             color='brown'
         ),
-        xaxis='x1',
-        yaxis='y1',
+        xaxis='x',
+        yaxis='y',
         showlegend=True
     )
 
     data.extend([trace7, trace8, trace9, trace10])
 
-    layout = go.Layout(
-        plot_bgcolor='#f9f7f7',
-        showlegend=True,
-        margin=dict(
-            l=10,
-            r=50,
-            b=50,
-            t=50,
-            pad=4
-        ),
-        titlefont=dict(
-            size=20,
-        ),
-        hovermode='closest',
-        autosize=True,
-        width=1200,
-        height=800,
-        xaxis=dict(
-            rangemode='normal',
-            title='Tunnel Wall Displacement [m]',
-            range=[0, max(x1)],
-            tickformat='.3f',
-            domain=[0, 0.47],
-            anchor='y2'
-        ),
-        yaxis=dict(
-            scaleratio=0.1,
-            tickformat='.2f',
-            title='Support Pressure [MPa]',
-            titlefont=dict(size=14),
-            range=[0, max(y1)],
-            domain=[0.55, 1]
-        ),
-        xaxis2=dict(
-            title='Time [days]',
-            tickformat='.2f',
-            domain=[0.55, 1],
-            anchor='y4'
-        ),
-        yaxis2=dict(
-            title='Distance from Tunnel Face [m]',
-            tickformat='.2f',
-            anchor='x1',
-            range=[80, -25],
-            domain=[0, 0.50]
-        ),
-        yaxis3=dict(
-            title='Support Pressure [MPa]',
-            tickformat='.2f',
-            range = [0, max(y1)],
-            domain=[0.55, 1],
-            anchor='x2',
-            rangemode='nonnegative'
-        ),
-        yaxis4=dict(
-            title='Stress SpC [MPa]',
-            tickformat='.2f',
-            domain=[0, 0.50],
-            anchor='x2',
-            rangemode='nonnegative'
-        ),
-        legend=dict(
-            traceorder='normal',
-            font=dict(
-                family='arial',
-                size=12,
-                color='#000'
-            ),
-            bgcolor='#E2E2E2',
-            bordercolor='#FFFFFF',
-            borderwidth=1.5
-        ),
-        shapes=shapes
-    )
-
-    fig = go.Figure(data=data, layout=layout)
-
-    return fig
+    layout = dict(LAYOUT, shapes=shapes,
+                  xaxis=dict(LAYOUT['xaxis'], range=[0, max(x1)]),
+                  yaxis=dict(LAYOUT['yaxis'], range=[0, max(y1)]),
+                  yaxis3=dict(LAYOUT['yaxis3'], range=[0, max(y1)]))
 
+    return {'data': data, 'layout': layout}
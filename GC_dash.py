@@ -1,13 +1,219 @@
 import dash
 from dash import dcc
 from dash import html
-from dash.dependencies import Output, Input
-from Ground_Curve import ground_curve as gc
+from dash import Patch
+from dash.dependencies import Output, Input, State
+from Ground_Curve import DEFAULTS, STAGES, GroundCurveResult
 from Draw_graph import draw
+from Cache import DiskCache, LRUCache, StageGraph, Tiered, memoize, \
+    private_directory
+from Timing import recording, span, timed_stages
+from Metrics import Metric, Registry, rss
 from textwrap import dedent
+import contextlib
+import flask
+import functools
+import glob
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+
+SLIDER_STEPS = {'gamma': 0.1, 'H': 10, 'E': 10000, 'nu': 0.01, 'D': 0.1,
+                'c': 10, 'phi': 0.1, 'f_ck': 1, 'E_c': 1000, 't_c': 0.05,
+                'dis_sup': 0.1, 'advance_rate': 0.1}
+# step of the slider of each parameter of ground_curve, which is also the
+# resolution of the result caches
+
+TRACE_POINTS = 150
+# points per trace sent to the browser (about 1 px off the full curves)
+
+BACKGROUND = os.environ.get('GC_BACKGROUND', '0') == '1'
+# run the figure callback as a background job (GC_BACKGROUND=1, needs
+# diskcache): a slow case then does not block a server worker, but every
+# job is a new process without the caches of the worker and the browser
+# polls for its result every JOB_INTERVAL ms
+
+JOB_INTERVAL = 100
+# [ms] - polling interval of the browser for a background job
+
+JOBS_DIR = os.environ.get('GC_JOBS', os.path.join(tempfile.gettempdir(),
+                                                  'ground-curve-jobs'))
+# directory of the background jobs and their progress, shared by all
+# workers of the server (GC_BACKGROUND=1); it must be owned by the user and
+# not writable by others, else the app does not start
+
+CACHE_DIR = os.environ.get('GC_CACHE', os.path.join(tempfile.gettempdir(),
+                                                    'ground-curve'))
+# directory of the figure cache shared by all workers of the server (and
+# the background jobs); GC_CACHE= (empty) turns it off. It must be owned
+# by the user of the server and not writable by others, else it is not used
+
+TIMING = os.environ.get('GC_TIMING', '1') == '1'
+# time the stages, draw and the callback and send the times to the browser
+# as Server-Timing headers (GC_TIMING=0 turns it off) ...
+TIMING_LOG = os.environ.get('GC_TIMING_LOG', '0') == '1'
+# ... and log them as one JSON line per callback to stderr (GC_TIMING_LOG=1)
+
+METRICS_DIR = os.environ.get('GC_METRICS', os.path.join(
+    tempfile.gettempdir(), 'ground-curve-metrics'))
+# directory of the metrics of all workers of the server, served at
+# /metrics; like GC_CACHE it must be owned by the user and not writable by
+# others
+
+METRICS = {
+    'gc_callback_requests_total': Metric(
+        'counter', 'Calls of the callback.'),
+    'gc_callback_errors_total': Metric(
+        'counter', 'Calls of the callback which raised.'),
+    'gc_callback_duration_seconds': Metric(
+        'histogram', 'Wall time of the callback.'),
+    'gc_callbacks_in_progress': Metric(
+        'gauge', 'Callbacks being computed by the worker.'),
+    'gc_figures_total': Metric(
+        'counter', 'Figures computed (not cached), by whether the support '
+        'reaches the ground curve (19 results) or not (14).'),
+    'gc_figure_duration_seconds': Metric(
+        'histogram', 'Wall time of computing a figure, by whether the '
+        'support reaches the ground curve.'),
+    'gc_resident_memory_bytes': Metric(
+        'gauge', 'Resident memory of the worker.'),
+    'gc_peak_array_bytes': Metric(
+        'gauge', 'Largest size of the arrays computed by one callback '
+        '(with GC_TIMING=1).'),
+    'gc_cache_hits_total': Metric(
+        'counter', 'Hits of the cache (figure_memory, figure_disk or '
+        'stage_<name>) in the worker.'),
+    'gc_cache_misses_total': Metric(
+        'counter', 'Misses of the cache in the worker.'),
+    'gc_cache_evictions_total': Metric(
+        'counter', 'Entries evicted from the cache by the worker.'),
+    'gc_cache_entries': Metric(
+        'gauge', 'Entries of the cache (of figure_disk: shared by all '
+        'workers).'),
+    'gc_cache_bytes': Metric(
+        'gauge', 'Size of the entries of the cache (of figure_disk: shared '
+        'by all workers).'),
+}
+# the metrics of the app; in background mode (GC_BACKGROUND=1) the callback
+# runs in job processes, whose metrics are not collected
+
+log = logging.getLogger('ground_curve.timing')
+if TIMING_LOG:
+    log.addHandler(logging.StreamHandler(sys.stderr))
+    log.setLevel(logging.INFO)
+
+stages = StageGraph(timed_stages(STAGES), SLIDER_STEPS, DEFAULTS)
+# intermediate results of ground_curve; a slider change only recomputes the
+# stages which depend on its value
+
+
+def _collect(registry):
+    """gauges and cache counters of the worker, before every write"""
+    registry.set('gc_resident_memory_bytes', rss())
+    caches = {'stage_' + name: cache_stats
+              for name, cache_stats in stages.stats().items()}
+    tiers = getattr(figure_cache, 'caches', (figure_cache,))
+    for tier, cache in zip(('figure_memory', 'figure_disk'), tiers):
+        caches[tier] = cache.stats()
+    for cache, cache_stats in caches.items():
+        for key, value in cache_stats.items():
+            name = f'gc_cache_{key}' + ('_total' if key in (
+                'hits', 'misses', 'evictions') else '')
+            registry.set(name, value, cache=cache)
+
+
+try:
+    metrics = Registry(METRICS, METRICS_DIR, collect=_collect)
+except PermissionError as e:
+    warnings.warn(f'metrics of this worker only: {e}')
+    metrics = Registry(METRICS, tempfile.mkdtemp(), collect=_collect)
+
+
+def instrumented(function):
+    """callback function counted and timed in the metrics"""
+    name = function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        metrics.inc('gc_callbacks_in_progress')
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            metrics.inc('gc_callback_errors_total', callback=name)
+            raise
+        finally:
+            metrics.inc('gc_callbacks_in_progress', -1)
+            metrics.inc('gc_callback_requests_total', callback=name)
+            metrics.observe('gc_callback_duration_seconds',
+                            time.perf_counter() - start, callback=name)
+    return wrapper
+
+
+def gc(**values):
+    """ground_curve for the given input values, computed by stages"""
+    return GroundCurveResult(values, stages)
+
+
+LABELS = (
+    # slider, label container, text, format of the value, unit
+    ('gamma_value', 'gamma-value-container', 'γ', '0.1f', 'kN/m³'),
+    ('overburden_value', 'overburden-value-container', 'Overburden', 'd',
+     'm'),
+    ('e_module', 'e-module-container', 'E-Module', ',', 'kPa'),
+    ('nu_value', 'nu-value-container', 'ν', '0.2f', '-'),
+    ('diameter_value', 'diameter-value-container', 'Tunnel Diameter', '0.2f',
+     'm'),
+    ('cohesion_value', 'cohesion-value-container', 'Cohesion', ',', 'kPa'),
+    ('phi_value', 'phi-value-container', 'φ', '0.1f', '°'),
+    ('f_ck_value', 'f_ck-value-container', 'SpC Strength', 'd', 'MPa'),
+    ('e_c_value', 'E_c-value-container', 'SpC Elasticity', ',', 'MPa'),
+    ('t_c_value', 't_c-value-container', 'SpC Thickness', '0.2f', 'm'),
+    ('dis_sup_value', 'dis_sup-value-container', 'SpC-Face Distance', '0.1f',
+     'm'),
+    ('advance_rate_value', 'advance-rate-value-container', 'Advance Rate',
+     '0.1f', 'm/day'),
+)
+# label of every slider: f'{text}: {value:format} [unit]'
+
+
+def label_function(text, spec, unit):
+    """
+    JavaScript function writing a slider value as its label, as
+    f'{text}: {value:spec} [unit]' would for the specs of LABELS: 'd',
+    ',' (thousands separated) and '0.nf' (n decimals)
+    """
+    if spec == 'd':
+        number = 'String(value)'
+    elif spec == ',':
+        number = "value.toLocaleString('en-US')"
+    else:
+        number = f'value.toFixed({int(spec[2:-1])})'
+    return (f'function(value) {{ return {json.dumps(text + ": ")} + '
+            f'{number} + {json.dumps(f" [{unit}]")}; }}')
+
 
+if BACKGROUND:
+    if diskcache is None:
+        raise ImportError('GC_BACKGROUND=1 needs diskcache '
+                          '(pip install dash[diskcache])')
+    private_directory(JOBS_DIR)
+    manager = dash.DiskcacheManager(diskcache.Cache(JOBS_DIR))
+else:
+    manager = None
 
-app = dash.Dash(__name__)
+app = dash.Dash(__name__, background_callback_manager=manager)
 
 app.title = 'Ground Reaction Curve'
 
@@ -96,7 +302,7 @@ app.layout = html.Div([
                                 value=20,
                                 min=15,
                                 max=30,
-                                step=0.1
+                                step=SLIDER_STEPS['gamma']
                             ),
                             html.Div(id='overburden-value-container',
                                      style={'margin': '5px 0px'}),
@@ -105,7 +311,7 @@ app.layout = html.Div([
                                 value=500,
                                 min=10,
                                 max=1000,
-                                step=10
+                                step=SLIDER_STEPS['H']
                             ),
                             html.Div(id='e-module-container',
                                      style={'margin': '10px 0px'}),
@@ -114,7 +320,7 @@ app.layout = html.Div([
                                 value=1050000,
                                 min=10000,
                                 max=16000000,
-                                step=10000
+                                step=SLIDER_STEPS['E']
                             ),
                             html.Div(id='nu-value-container',
                                      style={'margin': '10px 0px'}),
@@ -123,7 +329,7 @@ app.layout = html.Div([
                                 value=0.30,
                                 min=0.05,
                                 max=0.49,
-                                step=0.01
+                                step=SLIDER_STEPS['nu']
                             ),
                             html.Div(id='cohesion-value-container',
                                      style={'margin': '10px 0px'}),
@@ -132,7 +338,7 @@ app.layout = html.Div([
                                 value=1000,
                                 min=0,
                                 max=3000,
-                                step=10
+                                step=SLIDER_STEPS['c']
                             ),
                             html.Div(id='phi-value-container',
                                      style={'margin': '10px 0px'}),
@@ -141,7 +347,7 @@ app.layout = html.Div([
                                 value=28,
                                 min=15,
                                 max=45,
-                                step=0.1
+                                step=SLIDER_STEPS['phi']
                             ),
                             html.Div('Other Properties:', style={
                                 'borderBottom': 'thin lightgrey solid',
@@ -154,7 +360,7 @@ app.layout = html.Div([
                                 value=5,
                                 min=3,
                                 max=20,
-                                step=0.1
+                                step=SLIDER_STEPS['D']
                             ),
                             html.Div(id='f_ck-value-container',
                                      style={'margin': '10px 0px',
@@ -164,7 +370,7 @@ app.layout = html.Div([
                                 value=20,
                                 min=10,
                                 max=40,
-                                step=1
+                                step=SLIDER_STEPS['f_ck']
                             ),
                             html.Div(id='E_c-value-container',
                                      style={'margin': '10px 0px'}),
@@ -173,7 +379,7 @@ app.layout = html.Div([
                                 value=5000,
                                 min=5000,
                                 max=35000,
-                                step=1000
+                                step=SLIDER_STEPS['E_c']
                             ),
                             html.Div(id='t_c-value-container',
                                      style={'margin': '10px 0px'}),
@@ -182,7 +388,7 @@ app.layout = html.Div([
                                 value=0.2,
                                 min=0,
                                 max=1,
-                                step=0.05
+                                step=SLIDER_STEPS['t_c']
                             ),
                             html.Div(id='dis_sup-value-container',
                                      style={'margin': '10px 0px'}),
@@ -191,7 +397,7 @@ app.layout = html.Div([
                                 value=2,
                                 min=0,
                                 max=5,
-                                step=0.1
+                                step=SLIDER_STEPS['dis_sup']
                             ),
                             html.Div(id='advance-rate-value-container',
                                      style={'margin': '10px 0px'}),
@@ -200,7 +406,7 @@ app.layout = html.Div([
                                 value=5,
                                 min=1,
                                 max=10,
-                                step=0.1
+                                step=SLIDER_STEPS['advance_rate']
                             )
                         ])
                    ]),
@@ -214,7 +420,12 @@ app.layout = html.Div([
                           'padding': 0},
                    children=[
                        row([
-                            html.Div(id='plotly-figure'),
+                            html.Progress(id='figure-progress',
+                                          style={'visibility': 'hidden'}),
+                            # progress of a background job
+                            dcc.Graph(id='plotly-figure'),
+                            dcc.Store(id='figure-values'),
+                            # slider values of the figure in the browser
                             row(id='Source Code',
                                 style={'width': '15%',
                                        'borderTop': 'thin lightgrey solid',
@@ -238,104 +449,197 @@ app.layout = html.Div([
 ])
 
 
-@app.callback(
-    Output('gamma-value-container', 'children'),
-    [Input('gamma_value', 'value')]
-)
-def update_output(slider_value):
-    return f'γ: {slider_value:0.1f} [kN/m³]'
-
-
-@app.callback(
-    Output('overburden-value-container', 'children'),
-    [Input('overburden_value', 'value')]
-)
-def update_output(slider_value):
-    return f'Overburden: {slider_value:d} [m]'
-
-
-@app.callback(
-    Output('e-module-container', 'children'),
-    [Input('e_module', 'value')]
-)
-def update_output(slider_value):
-    return f'E-Module: {slider_value:,} [kPa]'
-
-
-@app.callback(
-    Output('nu-value-container', 'children'),
-    [Input('nu_value', 'value')]
-)
-def update_output(slider_value):
-    return f'ν: {slider_value:0.2f} [-]'
-
-
-@app.callback(
-    Output('diameter-value-container', 'children'),
-    [Input('diameter_value', 'value')]
-)
-def update_output(slider_value):
-    return f'Tunnel Diameter: {slider_value:0.2f} [m]'
-
-
-@app.callback(
-    Output('cohesion-value-container', 'children'),
-    [Input('cohesion_value', 'value')]
-)
-def update_output(slider_value):
-    return f'Cohesion: {slider_value:,} [kPa]'
-
-
-@app.callback(
-    Output('phi-value-container', 'children'),
-    [Input('phi_value', 'value')]
-)
-def update_output(slider_value):
-    return f'φ: {slider_value:0.1f} [°]'
-
-
-@app.callback(
-    Output('f_ck-value-container', 'children'),
-    [Input('f_ck_value', 'value')]
-)
-def update_output(slider_value):
-    return f'SpC Strength: {slider_value:d} [MPa]'
-
-
-@app.callback(
-    Output('E_c-value-container', 'children'),
-    [Input('e_c_value', 'value')]
-)
-def update_output(slider_value):
-    return f'SpC Elasticity: {slider_value:,} [MPa]'
-
-
-@app.callback(
-    Output('t_c-value-container', 'children'),
-    [Input('t_c_value', 'value')]
-)
-def update_output(slider_value):
-    return f'SpC Thickness: {slider_value:0.2f} [m]'
-
-
-@app.callback(
-    Output('dis_sup-value-container', 'children'),
-    [Input('dis_sup_value', 'value')]
-)
-def update_output(slider_value):
-    return f'SpC-Face Distance: {slider_value:0.1f} [m]'
-
-
-@app.callback(
-    Output('advance-rate-value-container', 'children'),
-    [Input('advance_rate_value', 'value')]
-)
-def update_output(slider_value):
-    return f'Advance Rate: {slider_value:0.1f} [m/day]'
-
-
-@app.callback(
-    Output('plotly-figure', 'children'),
+for slider, container, text, spec, unit in LABELS:
+    app.clientside_callback(label_function(text, spec, unit),
+                            Output(container, 'children'),
+                            Input(slider, 'value'))
+# the labels are written in the browser, without a request to the server
+
+
+def draw_arguments(result):
+    """keyword arguments of draw for the figure of a GroundCurveResult"""
+    p1, p2_el, p3_el = result.ground_curve, result.support_el, \
+        result.intersection_el
+    p4, p5, point_critical = result.ldp, result.support_time, \
+        result.critical_point
+
+    if result.x_int is not None:
+        p7, p8, p9 = result.ldp_updated, result.ldp_family, \
+            result.ldp_support
+        p10, p11 = result.rate_of_flow, result.scl_strength
+        return dict(x1=p1.x, y1=p1.y,
+                    x2=p2_el.x, y2=p2_el.y,
+                    x3=p3_el.x, y3=p3_el.y,
+                    safety_factor=result.safety_factor,
+                    flag=result.intersection.x,
+                    x4=p4.x, y4=p4.y,
+                    x5=p7.x, y5=p7.y,
+                    x6=p8.x, y6=p8.y,
+                    x7=p9.x, y7=p9.y,
+                    x8=p5.x, y8=p5.y,
+                    x9=p10.x, y9=p10.y,
+                    x10=p11.x, y10=p11.y,
+                    x11=point_critical.x, y11=point_critical.y,
+                    max_points=TRACE_POINTS)
+    return dict(x1=p1.x, y1=p1.y,
+                x2=p2_el.x, y2=p2_el.y,
+                x3=p3_el.x, y3=p3_el.y,
+                safety_factor=result.safety_factor,
+                x4=p4.x, y4=p4.y,
+                x8=p5.x, y8=p5.y,
+                x11=point_critical.x, y11=point_critical.y,
+                max_points=TRACE_POINTS)
+
+
+def _figure(gamma, H, E, nu, D, c, phi, f_ck, E_c, t_c, dis_sup,
+            advance_rate):
+    """the figure of the app for the given slider values"""
+    start = time.perf_counter()
+    result = gc(gamma=gamma, H=H, E=E, nu=nu, D=D, c=c, phi=phi, f_ck=f_ck,
+                E_c=E_c, t_c=t_c, dis_sup=dis_sup, advance_rate=advance_rate,
+                precision=32)
+    # 32 bit curves are plenty for the plots and halve their payload
+    arguments = draw_arguments(result)
+    with span('draw') as s:
+        fig = draw(**arguments)
+        s.returns(fig['data'])  # the layout is mostly shared
+    branch = str(result.x_int is not None).lower()
+    metrics.inc('gc_figures_total', intersection=branch)
+    metrics.observe('gc_figure_duration_seconds',
+                    time.perf_counter() - start, intersection=branch)
+    return fig
+
+
+def code_version():
+    """
+    hash of the code the figures depend on, every module of the app (those
+    it imports, such as Rate_of_Flow, included): figures cached on disk by
+    another version are not used
+    """
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for file_name in sorted(glob.glob(os.path.join(directory, '*.py'))):
+        with open(file_name, 'rb') as f:
+            digest.update(os.path.basename(file_name).encode())
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+figure_cache = LRUCache(max_entries=64, max_bytes=64 * 2 ** 20)
+if CACHE_DIR:
+    try:
+        figure_cache = Tiered(figure_cache,
+                              DiskCache(CACHE_DIR, max_bytes=256 * 2 ** 20,
+                                        salt=code_version()))
+    except PermissionError as e:
+        warnings.warn(f'figure cache not shared between workers: {e}')
+figure = memoize(_figure, SLIDER_STEPS, figure_cache)
+# figures of repeated slider positions are served from memory, or from the
+# disk if another worker made them
+
+
+def _same(a, b):
+    """whether two values of a plotly figure dict are equal"""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return (isinstance(a, np.ndarray) and isinstance(b, np.ndarray)
+                and a.dtype == b.dtype and np.array_equal(a, b))
+    if isinstance(a, dict):
+        return (isinstance(b, dict) and a.keys() == b.keys()
+                and all(_same(a[key], b[key]) for key in a))
+    if isinstance(a, (list, tuple)):
+        return (isinstance(b, (list, tuple)) and len(a) == len(b)
+                and all(_same(u, v) for u, v in zip(a, b)))
+    return a == b
+
+
+def figure_patch(old, new):
+    """
+    Patch turning the figure old into new: only the changed properties of
+    the traces and the changed layout entries are sent. None if the two
+    differ in their traces or layout entries, then new has to be sent.
+    """
+    if (len(old['data']) != len(new['data'])
+            or old['layout'].keys() != new['layout'].keys()
+            or any(a.keys() != b.keys()
+                   for a, b in zip(old['data'], new['data']))):
+        return None
+    patch = Patch()
+    for i, (a, b) in enumerate(zip(old['data'], new['data'])):
+        for key in b:
+            if not _same(a[key], b[key]):
+                patch['data'][i][key] = b[key]
+    for key in new['layout']:
+        if not _same(old['layout'][key], new['layout'][key]):
+            patch['layout'][key] = new['layout'][key]
+    return patch
+
+
+def report(callback, values, spans):
+    """
+    pass the spans of a callback to the Server-Timing headers of its
+    response, the log and the metrics
+    """
+    metrics.maximum('gc_peak_array_bytes', sum(s.nbytes for s in spans))
+    if flask.has_request_context():
+        flask.g.spans = flask.g.get('spans', []) + spans
+    if TIMING_LOG:
+        log.info(json.dumps({
+            'callback': callback, 'values': values,
+            'spans': [{'name': s.name, 'ms': round(1e3 * s.duration, 3),
+                       'bytes': s.nbytes} for s in spans]}))
+
+
+@server.after_request
+def server_timing(response):
+    """Server-Timing headers of the spans of the request"""
+    for s in flask.g.pop('spans', ()):
+        response.headers.add('Server-Timing',
+                             f'{s.name};dur={1e3 * s.duration:.3f};'
+                             f'desc="{s.nbytes} B"')
+    return response
+
+
+@server.route('/metrics')
+def serve_metrics():
+    """the metrics of all workers in the Prometheus text format"""
+    return flask.Response(metrics.exposition(),
+                          content_type='text/plain; version=0.0.4; '
+                                       'charset=utf-8')
+
+
+@instrumented
+def update_output(set_progress, gamma_value, overburden_value, e_module,
+                  nu_value, diameter_value, cohesion_value, phi_value,
+                  f_ck_value, e_c_value, t_c_value, dis_sup_value,
+                  advance_rate_value, previous=None):
+    values = dict(gamma=gamma_value, H=overburden_value, E=e_module,
+                  nu=nu_value, D=diameter_value, c=cohesion_value,
+                  phi=phi_value, f_ck=f_ck_value, E_c=e_c_value,
+                  t_c=t_c_value, dis_sup=dis_sup_value,
+                  advance_rate=advance_rate_value)
+    with (recording() if TIMING else contextlib.nullcontext()) as spans:
+        with span('callback'):
+            if set_progress is not None:
+                # background job: compute the stages one by one to report
+                # progress
+                for i, name in enumerate(STAGES):
+                    set_progress((i, len(STAGES) + 1))
+                    stages((name,), **values, precision=32)
+                set_progress((len(STAGES), len(STAGES) + 1))
+            fig = figure(**values)
+            # the browser shows the figure of the previous values (a cache
+            # hit): send only what differs from it
+            with span('patch'):
+                patch = None if previous is None else figure_patch(
+                    figure(**previous), fig)
+    if spans:
+        report('update_output', values, spans)
+    return (fig if patch is None else patch), values
+
+
+callback = app.callback(
+    Output('plotly-figure', 'figure'),
+    Output('figure-values', 'data'),
     [Input('gamma_value', 'value'),
      Input('overburden_value', 'value'),
      Input('e_module', 'value'),
@@ -347,56 +651,20 @@ def update_output(slider_value):
      Input('e_c_value', 'value'),
      Input('t_c_value', 'value'),
      Input('dis_sup_value', 'value'),
-     Input('advance_rate_value', 'value')]
+     Input('advance_rate_value', 'value')],
+    State('figure-values', 'data'),
+    **(dict(background=True, interval=JOB_INTERVAL,
+            progress=[Output('figure-progress', 'value'),
+                      Output('figure-progress', 'max')],
+            running=[(Output('figure-progress', 'style'),
+                      {'visibility': 'visible'},
+                      {'visibility': 'hidden'})])
+       if BACKGROUND else {})
 )
-def update_output(gamma_value, overburden_value, e_module, nu_value,
-                  diameter_value, cohesion_value, phi_value, f_ck_value,
-                  e_c_value, t_c_value, dis_sup_value, advance_rate_value):
-    values = gc(gamma=gamma_value, H=overburden_value, E=e_module,
-                nu=nu_value, D=diameter_value, c=cohesion_value,
-                phi=phi_value, f_ck=f_ck_value, E_c=e_c_value, t_c=t_c_value,
-                dis_sup=dis_sup_value, advance_rate=advance_rate_value)
-    if len(values) == 14:
-        p1, p2, p2_el, p3, p3_el, p4, p5, p6, v1, v1_el, v2, v2_el, v3, \
-        point_critical = values
-    else:
-        p1, p2, p2_el, p3, p3_el, p4, p5, p6, p7, p8, p9, p10, p11, v1, \
-            v1_el, v2, v2_el, v3, point_critical = values
-
-    if len(p3_el.y) != 0:
-        safety_factor_el = v1_el.val / v2_el.val
-    else:
-        safety_factor_el = 0
-
-    if len(p3.x) != 0:
-        flag = p3.x
-        fig = draw(x1=p1.x, y1=p1.y,
-                   x2=p2_el.x, y2=p2_el.y,
-                   x3=p3_el.x, y3=p3_el.y,
-                   safety_factor=safety_factor_el,
-                   flag=flag,
-                   x4=p4.x, y4=p4.y,
-                   x5=p7.x, y5=p7.y,
-                   x6=p8.x, y6=p8.y,
-                   x7=p9.x, y7=p9.y,
-                   x8=p5.x, y8=p5.y,
-                   x9=p10.x, y9=p10.y,
-                   x10=p11.x, y10=p11.y,
-                   x11=point_critical.x, y11=point_critical.y)
-    else:
-        fig = draw(x1=p1.x, y1=p1.y,
-                   x2=p2_el.x, y2=p2_el.y,
-                   x3=p3_el.x, y3=p3_el.y,
-                   safety_factor=safety_factor_el,
-                   x4=p4.x, y4=p4.y,
-                   x8=p5.x, y8=p5.y,
-                   x11=point_critical.x, y11=point_critical.y)
-
-    fig.update_xaxes(zeroline=True, zerolinewidth=1, zerolinecolor='black')
-    fig.update_yaxes(zeroline=True, zerolinewidth=1, zerolinecolor='black')
-
-    return dcc.Graph(figure=fig)
-
+# a background job of older slider values still running is cancelled by
+# dash when the callback is triggered again
+callback(update_output if BACKGROUND
+         else functools.partial(update_output, None))
 
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    app.run(debug=True)
@@ -1,45 +1,247 @@
-from Intersection import intersection
 from collections import namedtuple
 from Rate_of_Flow import rate_of_flow as rof
+import inspect
+import math
 import numpy as np
 
 
-def ground_curve(gamma=20, H=200, nu=0.3, E=1050000, D=5, c=1000, phi=28,
-                 f_ck=20, E_c=5000, nu_c=0.20, t_c=0.2, dis_sup=2,
-                 advance_rate=5):
+Rock = namedtuple('Rock', 'p_o sigma_cm k p_cr r_o x_cr r_pm u_im u_if')
+RockMass = namedtuple('RockMass', Rock._fields + ('u_io',))
+GroundCurve = namedtuple('GroundCurve', 'p_i x r_p')
+LDP = namedtuple('LDP', 'x u')
+SCL = namedtuple('SCL', 'time sigma p_scmax k_sc p_scmax_el k_sc_el')
+Support = namedtuple('Support', 'dis_sup u_io x_support y_support '
+                                'x_support_el y_support_el x_int y_int '
+                                'x_int_el y_int_el')
+LDPUpdate = namedtuple('LDPUpdate', 'x u_ix family x_l y_l')
+Flow = namedtuple('Flow', 'hours sigma')
+Stage = namedtuple('Stage', 'function parameters upstream')
+Plot = namedtuple('Plot', 'x y')
+Equilibrium = namedtuple('Equilibrium', 'p_cr x_cr u_im r_pm u_io x_int '
+                                        'y_int x_int_el y_int_el '
+                                        'safety_factor')
+
+_EPS = np.finfo(float).eps
+
+_MAX_POINTS = 5000
+# most support pressures at which the ground curve is sampled
+
+_DTYPES = {32: np.float32, 64: np.float64}
+# [bit] - precisions of the curves of ground_curve
+
+
+def _brentq(f, a, b, xtol=4 * _EPS, rtol=4 * _EPS, maxiter=200):
     """
-    # --------------------------------
-    # Input values for rock/soil
-    # --------------------------------
-    gamma        - [kN/m³] - specific weight of the rock mass
-    H            - [m]     - overburden
-    nu           - [-]     - Poisson's ratio of the rock
-    E            - [kPa]   - Modulus of elasticity of the rock
-    D            - [m]     - Diameter of the tunnel
-    c            - [kPa]   - Cohesion
-    phi          - [deg]   - Friction angle
-    # --------------------------------
-    # Input values for support members
-    # --------------------------------
-    f_ck         - [MPa]   - Uniaxial compressive strength of the
-                             sprayed concrete
-    E_c          - [MPa]   - Young's modulus of the sprayed concrete
-    nu_c         - [-]     - Poisson's ratio of the sprayed concrete
-    t_c          - [m]     - Thickness of the sprayed concrete
-    dis_sup      - [m]     - Distance of the support member to the face
-    advance_rate - [m/day] - Rate of advance
+    Brent's method for the root of f bracketed by [a, b] (f(a) and f(b)
+    of opposite sign). Bisects while a bracketing value is infinite.
+    """
+    x_pre, x_cur = a, b
+    f_pre, f_cur = f(a), f(b)
+    if f_pre == 0:
+        return x_pre
+    if f_cur == 0:
+        return x_cur
+    x_blk = f_blk = s_pre = s_cur = 0.
+    for _ in range(maxiter):
+        if f_pre != 0 and f_cur != 0 and (f_pre < 0) != (f_cur < 0):
+            x_blk, f_blk = x_pre, f_pre
+            s_pre = s_cur = x_cur - x_pre
+        if abs(f_blk) < abs(f_cur):
+            x_pre, x_cur, x_blk = x_cur, x_blk, x_cur
+            f_pre, f_cur, f_blk = f_cur, f_blk, f_cur
+
+        delta = (xtol + rtol * abs(x_cur)) / 2
+        s_bis = (x_blk - x_cur) / 2
+        if f_cur == 0 or abs(s_bis) < delta:
+            return x_cur
+
+        if (abs(s_pre) > delta and abs(f_cur) < abs(f_pre)
+                and math.isfinite(f_pre) and math.isfinite(f_blk)):
+            if x_pre == x_blk:
+                # secant
+                s_try = -f_cur * (x_cur - x_pre) / (f_cur - f_pre)
+            else:
+                # inverse quadratic interpolation
+                d_pre = (f_pre - f_cur) / (x_pre - x_cur)
+                d_blk = (f_blk - f_cur) / (x_blk - x_cur)
+                s_try = -f_cur * (f_blk * d_blk - f_pre * d_pre) / (
+                    d_blk * d_pre * (f_blk - f_pre))
+            if 2 * abs(s_try) < min(abs(s_pre), 3 * abs(s_bis) - delta):
+                s_pre, s_cur = s_cur, s_try
+            else:
+                s_pre = s_cur = s_bis
+        else:
+            s_pre = s_cur = s_bis
+
+        x_pre, f_pre = x_cur, f_cur
+        if abs(s_cur) > delta:
+            x_cur += s_cur
+        else:
+            x_cur += delta if s_bis > 0 else -delta
+        f_cur = f(x_cur)
+    return x_cur
+
+
+def _elastic_displacement(p_i, rock, nu, E):
+    """
+    inward radial elastic displacement [m] of the tunnel wall at the support
+    pressure p_i [kPa]; like the next two for floats or arrays
+    """
+    return rock.r_o * (1 + nu) / E * (rock.p_o - p_i)
+
+
+def _plastic_radius(p_i, rock):
+    """radius of the plastic zone [m] at the support pressure p_i [kPa]"""
+    p_o, sigma_cm, k = rock.p_o, rock.sigma_cm, rock.k
+    return rock.r_o * (2 * (p_o * (k - 1) + sigma_cm) / (1 + k) / (
+        (k - 1) * p_i + sigma_cm)) ** (1 / (k - 1))
+
+
+def _plastic_displacement(p_i, r_p, rock, nu, E):
+    """
+    inward radial plastic displacement [m] of the tunnel wall at the support
+    pressure p_i [kPa] with a plastic zone of radius r_p [m]
+    """
+    p_o, r_o = rock.p_o, rock.r_o
+    return r_o * (1 + nu) / E * (
+        2 * (1 - nu) * (p_o - rock.p_cr) * (r_p / r_o) ** 2 - (
+            1 - 2 * nu) * (p_o - p_i))
+
+
+def _displacement(p_i, rock, nu, E):
+    """
+    Tunnel wall displacement [m] of the ground curve at the support
+    pressures p_i [kPa], an array (closed form of the x values of the blue
+    curve): elastic above the critical pressure, plastic below
+    """
+    return np.where(p_i > rock.p_cr, _elastic_displacement(p_i, rock, nu, E),
+                    _plastic_displacement(p_i, _plastic_radius(p_i, rock),
+                                          rock, nu, E))
+
+
+def _ground_displacement(p_i, rock, nu, E):
+    """
+    _displacement at a single support pressure p_i [kPa] for a rock of
+    floats, without numpy for the speed of the root finding
+    """
+    if p_i > rock.p_cr:
+        return _elastic_displacement(p_i, rock, nu, E)
+    if (rock.k - 1) * p_i + rock.sigma_cm <= 0:
+        return math.inf
+    return _plastic_displacement(p_i, _plastic_radius(p_i, rock), rock, nu,
+                                 E)
+
+
+def _support_equilibrium(x_sup, y_sup, rock, nu, E):
+    """
+    Intersection of a support line (x [m], y [MPa]), rising in x and y,
+    with the ground curve of _ground_displacement. The residual (ground
+    minus support displacement) then falls along the support line, so the
+    crossing segment is found by bisection over the vertices and the exact
+    point by Brent's method.
+    Returns arrays of length one, or empty arrays if the curves do not meet.
+    """
+    x_sup = np.asarray(x_sup, dtype=float).tolist()
+    y_sup = np.asarray(y_sup, dtype=float).tolist()
+
+    def residual(x, y):
+        return _ground_displacement(1000 * y, rock, nu, E) - x
+
+    lo, hi = 0, len(x_sup) - 1
+    r_lo = residual(x_sup[lo], y_sup[lo])
+    r_hi = residual(x_sup[hi], y_sup[hi])
+    if not (r_lo >= 0 >= r_hi):
+        # also catches NaN support lines
+        return np.empty(0), np.empty(0)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        r_mid = residual(x_sup[mid], y_sup[mid])
+        if r_mid >= 0:
+            lo, r_lo = mid, r_mid
+        else:
+            hi, r_hi = mid, r_mid
+
+    x0, y0 = x_sup[lo], y_sup[lo]
+    dx, dy = x_sup[hi] - x0, y_sup[hi] - y0
+    t = _brentq(lambda t: residual(x0 + t * dx, y0 + t * dy), 0., 1.)
+    return np.array([x0 + t * dx]), np.array([y0 + t * dy])
+
+
+def inverse_ldp(u, u_im, u_if, r_p):
+    """
+    Distance from the tunnel face [m] at which the longitudinal displacement
+    profile behind the face (Vlachopoulos and Diederichs) reaches the wall
+    displacement u [m]. All arguments broadcast against each other, so a
+    whole family of profiles (u_im, u_if, r_p per row) is inverted in one
+    call. The result is negative for u < u_if (the profile ahead of the face
+    applies there) and NaN for u >= u_im, which is never reached.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -2 * r_p / 3 * np.log((1 - u / u_im) / (1 - u_if / u_im))
+
+
+class LDPFamily:
+    """
+    Longitudinal displacement profiles over the distances x [m] for a range
+    of support pressures. Only the parameters of each profile are stored
+    (plastic radius r_p, maximum displacement u_im and face displacement
+    u_if); rows are evaluated when read. Indexing behaves like the dense
+    len(r_p) x len(x) array: family[-1] is one profile [m], family[::30] a
+    2D array of every 30th profile. Rows are of type dtype.
+    """
+    __slots__ = ('x', 'r_o', 'r_p', 'u_im', 'u_if', 'dtype')
+
+    def __init__(self, x, r_o, r_p, u_im, u_if, dtype=float):
+        self.x = x
+        self.r_o = r_o
+        self.r_p = r_p
+        self.u_im = u_im
+        self.u_if = u_if
+        self.dtype = np.dtype(dtype)
+
+    def astype(self, dtype):
+        """the same family with rows of type dtype"""
+        return LDPFamily(self.x, self.r_o, self.r_p, self.u_im, self.u_if,
+                         dtype)
+
+    def __len__(self):
+        return len(self.r_p)
+
+    @property
+    def shape(self):
+        return len(self.r_p), len(self.x)
+
+    def __getitem__(self, index):
+        x, r_o = self.x, self.r_o
+        r_p, u_im, u_if = (np.asarray(a[index])[..., None]
+                           for a in (self.r_p, self.u_im, self.u_if))
+        u_ix_a = (u_if) * np.exp(x / r_o)
+        # Tunnel wall displacement ahead of the face (x < 0) [m]
+        u_ix_b = u_im * (1 - (1 - u_if / u_im) * np.exp(
+            (-3 * x / r_o) / (2 * r_p / r_o)))
+        # Tunnel wall displacement behind the face (x > 0) [m]
+        return np.where(x < 0, u_ix_a, u_ix_b).astype(self.dtype, copy=False)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self[:], dtype=dtype)
+
+
+def _rock(gamma, H, nu, E, D, c, phi):
+    """
+    Stage rock: scalar results of the ground curve (a.) and the longitudinal
+    displacement profile (b.). The arguments may be arrays of cases.
     """
     p_o = gamma * H  # [kPa]   - in situ stress
     Phi = np.deg2rad(phi)  # [rad] - conversion from degrees to radians
-    p_i = np.linspace(0, p_o, 5000)
-    # [kPa] - Support pressure (an array from zero to insitu stress)
     sigma_cm = 2 * c * np.cos(Phi) / (1 - np.sin(
         Phi))  # [kPa] - the uniaxial strength of the rock mass
     k = (1 + np.sin(Phi)) / (1 - np.sin(
         Phi))  # [-] - slope defined by the Mohr-Coulomb criterion
 
-    # Analysis of tunnel behaviour:
-
     #############################
     # a. Tunnel wall displacement
     #############################
@@ -52,214 +254,542 @@ def ground_curve(gamma=20, H=200, nu=0.3, E=1050000, D=5, c=1000, phi=28,
     r_o = D / 2
     # [m] - radius of the tunnel
 
-    u_ie = r_o * (1 + nu) / E * (p_o - p_i)
-    # [m] - inward radial elastic displacement (Pi is a variable)
-
-    r_p = r_o * (2 * (p_o * (k - 1) + sigma_cm) / (1 + k) / (
-                (k - 1) * p_i + sigma_cm)) ** (1 / (k - 1))
+    rock = Rock(p_o=p_o, sigma_cm=sigma_cm, k=k, p_cr=p_cr, r_o=r_o,
+                x_cr=None, r_pm=None, u_im=None, u_if=None)
+    # the parameters of the displacements, completed below
 
-    # r_p = np.where(p_i < p_cr, r_p, r_o) <-- not needed
-    # in order to draw the plastic radius curve if needed
-    # # [m] - radius of the plastic zone
-    # # if the support pressure is higher than critical pressure then the
-    # # plastic radius is equal to tunnel radius
-
-    u_ip = r_o * (1 + nu) / E * (
-        2 * (1 - nu) * (p_o - p_cr) * (r_p / r_o) ** 2 - (
-            1 - 2 * nu) * (p_o - p_i))
-    # [m] - inward radial plastic displacement (Pi is a variable)
-
-    x = np.where(p_i > p_cr, u_ie, u_ip)
-    # [m] - displacement before and after critical support pressure
-    # x values to draw the blue ground curve#
-    # y values are y = p_i / 1000 : [MPa]
-
-    critical_value_index = (np.abs(p_i - p_cr)).argmin()
-    # returns the index of the minimum value of (p_i - p_cr)
-    x_cr = u_ie[critical_value_index].item()
+    x_cr = _elastic_displacement(np.clip(p_cr, 0, p_o), rock, nu, E)
     # [m] - displacement where support pressure equals critical pressure
 
     #####################################
     # b. Longitudinal displacement profile
     #####################################
 
-    r_pm = r_o * ((2 * (p_o * (k - 1) + sigma_cm)) / ((1 + k) * sigma_cm)) ** (
-        1 / (k - 1))
+    r_pm = _plastic_radius(0, rock)
     # Maximum plastic zone radius [m]
 
-    u_im = r_o * (1 + nu) / E * (
-        2 * (1 - nu) * (p_o - p_cr) * (r_pm / r_o) ** 2 - (
-            1 - 2 * nu) * (p_o))
+    u_im = _plastic_displacement(0, r_pm, rock, nu, E)
     # Maximum displacement [m] - r_p = r_pm; p_i = 0
 
     u_if = (u_im / 3) * np.exp(-0.15 * (r_pm / r_o))
     # Displacement at the tunnel face (by Vlachopoulus and Diederichs) [m]
 
-    # Calculate the displacement ahead of the face:
-    x_ = np.arange(-25, 80, 0.1)
-    # Distance from tunnel face (an array from -25m ahead and 80m behind the
-    # face) [m]
+    return rock._replace(x_cr=x_cr, r_pm=r_pm, u_im=u_im, u_if=u_if)
 
-    u_ix_a = (u_if) * np.exp(x_ / r_o)
-    # Tunnel wall displacement ahead of the face (x < 0) [m]#
-    # NOT NORMALIZED! meaning: * u_im
 
-    # Calculate the displacement behind the face:
-    u_ix_b = u_im * (1 - (1 - u_if / u_im) * np.exp(
-        (-3 * x_ / r_o) / (2 * r_pm / r_o)))
-    # Tunnel wall displacement behind the face (x > 0) [m]
-    # NOT NORMALIZED! meaning: * u_im
-
-    x_disp = np.where(x_ < 0, u_ix_a, u_ix_b)
-    # x values for longitudinal displacement profile (LDP)
+def _u_io(rock, dis_sup):
+    """
+    Tunnel wall displacement [m] at the installation of the support, dis_sup
+    [m] behind the face
+    """
+    return rock.u_im * (1 - (1 - rock.u_if / rock.u_im) * np.exp(
+        (-3 * dis_sup / rock.r_o) / (2 * rock.r_pm / rock.r_o)))
 
-    ################################################
-    # c. Calculate the actual/target strength of SCL
-    ################################################
 
-    # x_sup = np.arange(dis_sup, 80, 1)
-    # Distance from installation of SCL
+def _rock_mass(gamma, H, nu, E, D, c, phi, dis_sup):
+    """
+    Scalar results of the ground curve (a.) and the longitudinal
+    displacement profile (b.) and the wall displacement at the support
+    installation. The arguments may be arrays of cases.
+    """
+    rock = _rock(gamma, H, nu, E, D, c, phi)
+    return RockMass(*rock, u_io=_u_io(rock, dis_sup))
 
-    u_io = u_im * (1 - (1 - u_if / u_im) * np.exp(
-        (-3 * dis_sup / r_o) / (2 * r_pm / r_o)))
-    # Tunnel wall displacement behind SCL x > distance support [m]
 
-    time_672hours = np.arange(0, 28 * 24, 1)  # [hours]
-    time_28days = time_672hours / 24  # [days]
+def _aldrian(time, f_ck, E_c):
+    """
+    Strength sigma [MPa] and Young's modulus E_t [MPa] of the sprayed
+    concrete at the age time [hours] acc. Aldrian; arguments broadcast.
+    """
+    time_days = time / 24  # [days]
 
     # Strength evolution of SCL acc. Aldrian
-    sigma = np.array([f_ck * 0.03 * time if time < 8 else f_ck * np.sqrt(
-        (time - 5) / (45 + 0.925 * time))
-        for time in time_672hours])
+    # (abs only keeps the sqrt real for the hours < 8 which are not used)
+    sigma = np.where(time < 8, f_ck * 0.03 * time,
+                     f_ck * np.sqrt(np.abs(time - 5) / (45 + 0.925 * time)))
 
     # change of elasticity in time
     E_28 = E_c  # [MPa]
     P_Ar1 = 1
     P_Ar2 = 0.3
     P_Ar3 = 0.2
-    E_t = E_28 * (time_28days / (P_Ar1 + P_Ar2 * time_28days)) ** P_Ar3
+    E_t = E_28 * (time_days / (P_Ar1 + P_Ar2 * time_days)) ** P_Ar3
+    return sigma, E_t
 
+
+def _lining(sigma, E_t, nu_c, t_c, D):
+    """
+    Maximum support pressure [MPa] and stiffness [MPa/m] of a sprayed
+    concrete lining of strength sigma and Young's modulus E_t [MPa]
+    """
     p_scmax = sigma / 2 * (1 - ((D / 2 - t_c) ** 2 / (D / 2) ** 2))
     # maximum support pressure
 
     k_sc = E_t * ((D / 2) ** 2 - (D / 2 - t_c) ** 2) / (
         2 * (1 - nu_c ** 2) * (D / 2 - t_c) * (D / 2) ** 2)
     # stiffness of the support
+    return p_scmax, k_sc
 
-    p_scmax_el = f_ck / 2 * (1 - ((D / 2 - t_c) ** 2 / (D / 2) ** 2))
-    k_sc_el = E_c * ((D / 2) ** 2 - (D / 2 - t_c) ** 2) / (
-        2 * (1 - nu_c ** 2) * (D / 2 - t_c) * (D / 2) ** 2)
+
+def _sample_pressures(nu, E, rock, tolerance, max_points=_MAX_POINTS):
+    """
+    Support pressures [kPa] from zero to the in situ stress at which the
+    ground curve, interpolated linearly between them, deviates by at most
+    tolerance [m] from the exact displacement. The elastic branch is a line
+    between p_cr and p_o. An interval of the plastic branch deviating by
+    error in its middle is cut into sqrt(error / tolerance) equal parts, as
+    the deviation falls with the square of the interval; if that would
+    exceed max_points the remaining points are shared out in proportion.
+    Without cohesion the displacement is unbounded at zero pressure, so the
+    plastic branch is sampled from the first pressure of the equidistant
+    grid (tolerance 0) on.
+    """
+    rock = type(rock)(*(float(v) for v in rock))
+    p_o, p_cr = rock.p_o, rock.p_cr
+    if not 0 < p_cr < p_o:
+        return np.array([0., p_o])
+
+    def x(p_i):
+        return _plastic_displacement(p_i, _plastic_radius(p_i, rock), rock,
+                                     nu, E)
+
+    p_i = np.array([0., p_cr])
+    p_first = p_o / (_MAX_POINTS - 1)
+    if rock.sigma_cm <= 0 and p_first < p_cr:
+        p_i = np.array([0., p_first, p_cr])
+    with np.errstate(all='ignore'):
+        while len(p_i) < max_points - 1:
+            x_i = x(p_i)
+            error = np.abs(x((p_i[:-1] + p_i[1:]) / 2)
+                           - (x_i[:-1] + x_i[1:]) / 2)
+            # unbounded displacements (c = 0 at p_i = 0) are not refined
+            error[~np.isfinite(error)] = 0
+            refine = np.flatnonzero(error > tolerance)
+            if len(refine) == 0:
+                break
+            parts = np.ceil(np.sqrt(error[refine] / tolerance)).astype(int)
+            room = max_points - 1 - len(p_i)
+            full = parts.sum() - len(parts) >= room
+            if full:
+                parts = 1 + (parts - 1) * room // (parts.sum() - len(parts))
+            # parts - 1 new points in every refined interval
+            new = np.repeat(refine, parts - 1)
+            fraction = (np.arange(len(new)) + 1 - np.repeat(
+                np.cumsum(parts - 1) - (parts - 1), parts - 1)) / np.repeat(
+                parts, parts - 1)
+            p_i = np.sort(np.concatenate([
+                p_i, p_i[new] + fraction * (p_i[new + 1] - p_i[new])]))
+            if full:
+                break
+    return np.append(p_i, p_o)
+
+
+def _ground(nu, E, tolerance, rock):
+    """
+    Stage ground: the ground curve, sampled adaptively to tolerance [m] or
+    at 5000 equidistant support pressures for tolerance 0
+    """
+    p_o = rock.p_o
+
+    if tolerance > 0:
+        p_i = _sample_pressures(nu, E, rock, tolerance)
+    else:
+        p_i = np.linspace(0, p_o, _MAX_POINTS)
+    # [kPa] - Support pressure (an array from zero to insitu stress)
+
+    r_p = _plastic_radius(p_i, rock)
+
+    # r_p = np.where(p_i < p_cr, r_p, r_o) <-- not needed
+    # in order to draw the plastic radius curve if needed
+    # # [m] - radius of the plastic zone
+    # # if the support pressure is higher than critical pressure then the
+    # # plastic radius is equal to tunnel radius
+
+    x = _displacement(p_i, rock, nu, E)
+    # [m] - displacement before and after critical support pressure
+    # x values to draw the blue ground curve#
+    # y values are y = p_i / 1000 : [MPa]
+    return GroundCurve(p_i=p_i, x=x, r_p=r_p)
+
+
+def _ldp(rock):
+    """Stage ldp: the longitudinal displacement profile"""
+    r_o, r_pm, u_im, u_if = rock.r_o, rock.r_pm, rock.u_im, rock.u_if
+
+    # Calculate the displacement ahead of the face:
+    x_ = np.arange(-25, 80, 0.1)
+    # Distance from tunnel face (an array from -25m ahead and 80m behind the
+    # face) [m]
+
+    u_ix_a = (u_if) * np.exp(x_ / r_o)
+    # Tunnel wall displacement ahead of the face (x < 0) [m]#
+    # NOT NORMALIZED! meaning: * u_im
+
+    # Calculate the displacement behind the face:
+    u_ix_b = u_im * (1 - (1 - u_if / u_im) * np.exp(
+        (-3 * x_ / r_o) / (2 * r_pm / r_o)))
+    # Tunnel wall displacement behind the face (x > 0) [m]
+    # NOT NORMALIZED! meaning: * u_im
+
+    x_disp = np.where(x_ < 0, u_ix_a, u_ix_b)
+    # x values for longitudinal displacement profile (LDP)
+    return LDP(x=x_, u=x_disp)
+
+
+def _scl(f_ck, E_c, nu_c, t_c, D):
+    """
+    Stage scl: strength, support pressure and stiffness of the sprayed
+    concrete lining over its first 28 days and at its final strength
+    """
+    time_672hours = np.arange(0, 28 * 24, 1)  # [hours]
+    sigma, E_t = _aldrian(time_672hours, f_ck, E_c)
+    p_scmax, k_sc = _lining(sigma, E_t, nu_c, t_c, D)
+    p_scmax_el, k_sc_el = _lining(f_ck, E_c, nu_c, t_c, D)
     # elastic design
+    return SCL(time=time_672hours, sigma=sigma, p_scmax=p_scmax, k_sc=k_sc,
+               p_scmax_el=p_scmax_el, k_sc_el=k_sc_el)
+
+
+def _support(nu, E, dis_sup, rock, scl):
+    """
+    Stage support: the support lines and their equilibrium points with the
+    ground curve, which are computed in closed form (no support pressure
+    array is built here)
+    """
+    u_io = _u_io(rock, dis_sup)
+    # Tunnel wall displacement behind SCL x > distance support [m]
+
+    x_support = u_io + scl.p_scmax[1:] / scl.k_sc[1:]
+    y_support = scl.p_scmax[1:]
 
-    x_support = u_io + p_scmax[1:] / k_sc[1:]
-    y_support = p_scmax[1:]
+    ground = type(rock)(*(float(v) for v in rock))
+    nu, E = float(nu), float(E)
 
     # find the intersection of support & ground curves
-    x_int, y_int = intersection(x_support, y_support, x, p_i / 1000)
+    x_int, y_int = _support_equilibrium(x_support, y_support, ground, nu, E)
 
-    ratio_sc = p_scmax_el / k_sc_el
+    ratio_sc = scl.p_scmax_el / scl.k_sc_el
     u_iy = u_io + ratio_sc
     # displacement at the yield surface of support
     x_support_el = np.array([u_io, u_iy, u_iy * 1.005])
-    y_support_el = np.array([0, p_scmax_el, p_scmax_el])
-
-    # not used -> commented out
-    # x_sup_intersect = np.linspace(u_io, u_iy, len(x))
-    # y_sup_intersect = np.linspace(0, p_scmax_el, len(x))
+    y_support_el = np.array([0, scl.p_scmax_el, scl.p_scmax_el])
 
     # find the intersection of support & ground curves
-    x_int_el, y_int_el = intersection(x_support_el, y_support_el,
-                                      x, p_i/1000)
-
-    # define for convenience named tuples
-    Plot = namedtuple('Plot', 'x y')
-    Var = namedtuple('Variable', 'name val')
-    # assign defined named tuples to variables
-    # plot variables
-    p1 = Plot(x=x, y=p_i/1000)
-    p2 = Plot(x=x_support, y=y_support)
-    p2_el = Plot(x=x_support_el, y=y_support_el)
-    p3 = Plot(x=x_int, y=y_int)
-    p3_el = Plot(x=x_int_el, y=y_int_el)
-    p4 = Plot(x=x_disp, y=x_)
-    p5 = Plot(x=time_28days[1:], y=y_support)
-    p6 = Plot(x=x, y=r_p)
-    point_critical = Plot(x=[x_cr], y=[p_cr/1000])
-
-    # needed variables
-    v1 = Var(name='P_sc_max', val=p_scmax)
-    v1_el = Var(name='P_sc_max_el', val=p_scmax_el)
-    if len(y_int != 0):
-        v2 = Var(name='y_int', val=y_int[0])
-    else:
-        v2 = Var(name='y_int', val=None)
-    if len(y_int_el != 0):
-        v2_el = Var(name='y_int_el', val=y_int_el[0])
-    else:
-        v2_el = Var(name='y_int_el', val=None)
-    v3 = Var(name='dis_sup', val=dis_sup)
-
-    if len(p3.x) != 0:
-        p_point = p_i[np.where(x > x_int_el[0])]  # [kPa]
-        x_updated = np.linspace(-25, 80, len(p_point))  # [m]
-
-        # varying the distance from tunnel face
-        p_scl = np.linspace(u_io, x_int_el[0], len(p_point))  # [m]
-        p_point_x = []
-
-        p_x_l = []
-        p_y_l = []
-
-        # find the radius of plastic zone at the equilibrium point
-        r_pl_sup = r_o * (2 * (p_o * (k - 1) + sigma_cm) / (1 + k) / (
-                (k - 1) * max(p_point) + sigma_cm)) ** (1 / (k - 1))
-
-        for p_scl_inc, p_inc in zip(p_scl, p_point):
-            r_pl_sup_inc = r_o * (2 * (p_o * (k - 1) + sigma_cm) / (1 + k) / (
-                (k - 1) * p_inc + sigma_cm)) ** (1 / (k - 1))
-
-            u_im_inc = r_o * (1 + nu) / E * (
-                2 * (1 - nu) * (p_o - p_cr) * (r_pl_sup_inc / r_o) ** 2 - (
-                    1 - 2 * nu) * (p_o))
-            u_if_inc = (u_im_inc / 3) * np.exp(-0.15 * (r_pl_sup_inc / r_o))
-            u_ix_a_inc = (u_if_inc) * np.exp(x_updated / r_o)
-            u_ix_b_inc = u_im_inc * (1 - (1 - u_if_inc / u_im_inc) * np.exp(
-                (-3 * x_updated / r_o) / (2 * r_pl_sup_inc / r_o)))
-            u_ix_inc = np.where(x_updated < 0, u_ix_a_inc, u_ix_b_inc)
-            p_point_x.append(u_ix_inc)
-            # intersection points with vertical lines
-            p_ver_x = np.array([p_scl_inc, p_scl_inc])
-            p_ver_y = np.array([0, 50])
-            x1, y1 = intersection(p_ver_x, p_ver_y, u_ix_b_inc, x_updated)
-            if len(x1) != 0 or len(y1) != 0:
-                p_x_l.append(x1)
-                p_y_l.append(y1)
-        p_point_x = np.array(p_point_x)
-        p_x_l = np.array(p_x_l).flatten()
-        p_y_l = np.array(p_y_l).flatten()
-
-        # update the longitudinal displacement behind the face
-        u_im_updated = r_o * (1 + nu) / E * (
-            2 * (1 - nu) * (p_o - p_cr) * (r_pl_sup / r_o) ** 2 - (
-                1 - 2 * nu) * (p_o))
-        # Maximum displacement [m] - r_p = r_pm; p_i = 0
-        u_if_updated = (u_im_updated / 3) * np.exp(-0.15 * (r_pl_sup / r_o))
-        # Displacement at the tunnel face (by Vlachopoulus and Diederichs) [m]
-        u_ix_a_updated = (u_if_updated) * np.exp(x_updated / r_o)
-        # Tunnel wall displacement ahead the face (x < 0) [m]
-        u_ix_b_updated = u_im_updated * (
-            1 - (1 - u_if_updated / u_im_updated) * np.exp(
-                (-3 * x_updated / r_o) / (2 * r_pl_sup / r_o)))
-        u_ix_updated = np.where(x_updated < 0, u_ix_a_updated, u_ix_b_updated)
-        # Tunnel wall displacement behind the face (x > 0) [m]
-        p7 = Plot(x=u_ix_updated, y=x_updated)
-        p8 = Plot(x=p_point_x, y=x_updated)
-        p9 = Plot(x=p_x_l, y=p_y_l)  # points of the intersection of the curves
-        sigma_actual, arr_hours = rof(disp_array_2d=p9, rate=advance_rate)
-        p10 = Plot(x=arr_hours/24, y=sigma_actual)
-        p11 = Plot(x=time_672hours/24, y=sigma)
-        return p1, p2, p2_el, p3, p3_el, p4, p5, p6, p7, p8, p9, p10, p11, \
-            v1, v1_el, v2, v2_el, v3, point_critical
-
-    return p1, p2, p2_el, p3, p3_el, p4, p5, p6, v1, v1_el, v2, v2_el, v3, \
-           point_critical
+    x_int_el, y_int_el = _support_equilibrium(x_support_el, y_support_el,
+                                              ground, nu, E)
+
+    return Support(dis_sup=dis_sup, u_io=u_io, x_support=x_support,
+                   y_support=y_support, x_support_el=x_support_el,
+                   y_support_el=y_support_el, x_int=x_int, y_int=y_int,
+                   x_int_el=x_int_el, y_int_el=y_int_el)
+
+
+def _ldp_family(nu, E, rock, support):
+    """
+    Stage ldp_family: the longitudinal displacement profiles of the
+    supported tunnel, None if the support does not reach the ground curve.
+    The profiles belong to the support pressures of a 5000 point grid below
+    the equilibrium, independent of the sampling of the ground curve: the
+    rate of flow steps once per profile.
+    """
+    if len(support.x_int) == 0:
+        return None
+    p_o, r_o = rock.p_o, rock.r_o
+    x_int_el = support.x_int_el
+
+    p_point = np.linspace(0, p_o, _MAX_POINTS)
+    p_point = p_point[p_point < 1000 * support.y_int_el[0]]  # [kPa]
+    x_updated = np.linspace(-25, 80, len(p_point))  # [m]
+
+    # varying the distance from tunnel face
+    p_scl = np.linspace(support.u_io, x_int_el[0], len(p_point))  # [m]
+
+    # find the radius of plastic zone at the equilibrium point
+    r_pl_sup = _plastic_radius(max(p_point), rock)
+
+    # LDP family: one profile per support pressure p_point over the
+    # distances x_updated, evaluated lazily by LDPFamily
+    r_pl_sup_inc = _plastic_radius(p_point, rock)
+    u_im_inc = _plastic_displacement(0, r_pl_sup_inc, rock, nu, E)
+    u_if_inc = (u_im_inc / 3) * np.exp(-0.15 * (r_pl_sup_inc / r_o))
+
+    p_point_x = LDPFamily(x_updated, r_o, r_pl_sup_inc, u_im_inc, u_if_inc)
+
+    # distance from the face at which each profile reaches p_scl_inc
+    p_y_l = inverse_ldp(p_scl, u_im_inc, u_if_inc, r_pl_sup_inc)
+    # the profile of no support pressure reaches u_io at the face itself when
+    # the support is installed there (dis_sup=0), which rounding can put a
+    # fraction of a nanometre ahead of it: that point starts the rate of flow
+    p_y_l = np.where((p_y_l < 0) & (p_y_l > -1e-9), 0, p_y_l)
+    in_range = (p_y_l >= 0) & (p_y_l <= 50)
+    p_x_l = p_scl[in_range]
+    p_y_l = p_y_l[in_range]
+
+    # update the longitudinal displacement behind the face
+    u_im_updated = _plastic_displacement(0, r_pl_sup, rock, nu, E)
+    # Maximum displacement [m] - r_p = r_pm; p_i = 0
+    u_if_updated = (u_im_updated / 3) * np.exp(-0.15 * (r_pl_sup / r_o))
+    # Displacement at the tunnel face (by Vlachopoulus and Diederichs) [m]
+    u_ix_a_updated = (u_if_updated) * np.exp(x_updated / r_o)
+    # Tunnel wall displacement ahead the face (x < 0) [m]
+    u_ix_b_updated = u_im_updated * (
+        1 - (1 - u_if_updated / u_im_updated) * np.exp(
+            (-3 * x_updated / r_o) / (2 * r_pl_sup / r_o)))
+    u_ix_updated = np.where(x_updated < 0, u_ix_a_updated, u_ix_b_updated)
+    # Tunnel wall displacement behind the face (x > 0) [m]
+    return LDPUpdate(x=x_updated, u_ix=u_ix_updated, family=p_point_x,
+                     x_l=p_x_l, y_l=p_y_l)
+
+
+def _rate_of_flow(advance_rate, ldp_family):
+    """
+    Stage rate_of_flow: the actual support pressure [MPa] over the time
+    [hours] for the rate of advance, None without an LDP family
+    """
+    if ldp_family is None:
+        return None
+    sigma_actual, arr_hours = rof(
+        disp_array_2d=(ldp_family.x_l, ldp_family.y_l), rate=advance_rate)
+    return Flow(hours=arr_hours, sigma=sigma_actual)
+
+
+STAGES = {
+    'rock': Stage(_rock, ('gamma', 'H', 'nu', 'E', 'D', 'c', 'phi'), ()),
+    'ground': Stage(_ground, ('nu', 'E', 'tolerance'), ('rock',)),
+    'ldp': Stage(_ldp, (), ('rock',)),
+    'scl': Stage(_scl, ('f_ck', 'E_c', 'nu_c', 't_c', 'D'), ()),
+    'support': Stage(_support, ('nu', 'E', 'dis_sup'), ('rock', 'scl')),
+    'ldp_family': Stage(_ldp_family, ('nu', 'E'), ('rock', 'support')),
+    'rate_of_flow': Stage(_rate_of_flow, ('advance_rate',), ('ldp_family',)),
+}
+# stages of ground_curve in the order of computation: each is called with
+# its input values and the results of its upstream stages as keywords
+
+
+class GroundCurveResult:
+    """
+    Results of ground_curve. The scalar values (those of Equilibrium and
+    p_scmax_el, dis_sup) are computed with the result; the curves, each a
+    Plot of x and y values, are computed by their stages on first access
+    and kept. ldp_updated, ldp_family, ldp_support and rate_of_flow are
+    None if the support does not reach the ground curve. The curves are of
+    the precision (32 or 64 bit) given in values, the scalar values and the
+    equilibrium points always of 64 bit.
+    values - input values of ground_curve, missing ones take the defaults
+    stages - optional Cache.StageGraph of STAGES which computes the stages
+             (and caches them across results)
+    """
+    __slots__ = ('values', '_stages', '_results', 'p_cr', 'x_cr', 'u_im',
+                 'r_pm', 'u_io', 'x_int', 'y_int', 'x_int_el', 'y_int_el',
+                 'safety_factor', 'p_scmax_el', 'dis_sup')
+
+    def __init__(self, values, stages=None):
+        self.values = dict(DEFAULTS, **values)
+        if self.values['precision'] not in _DTYPES:
+            raise ValueError(f'precision must be one of {list(_DTYPES)}')
+        self._stages = stages
+        self._results = {}
+        if stages is not None:
+            self._results.update(stages(('rock', 'scl', 'support'),
+                                        **self.values))
+        rock, scl, s = (self._stage(name)
+                        for name in ('rock', 'scl', 'support'))
+
+        self.p_cr, self.x_cr, self.u_im, self.r_pm = rock.p_cr, rock.x_cr, \
+            rock.u_im, rock.r_pm
+        # [kPa], [m], [m], [m]
+        self.u_io, self.dis_sup = s.u_io, s.dis_sup  # [m]
+        self.x_int, self.y_int = (s.x_int[0], s.y_int[0]) \
+            if len(s.x_int) else (None, None)
+        self.x_int_el, self.y_int_el = (s.x_int_el[0], s.y_int_el[0]) \
+            if len(s.x_int_el) else (None, None)
+        # [m], [MPa] - equilibrium points, None if the curves do not meet
+        self.p_scmax_el = scl.p_scmax_el  # [MPa]
+        self.safety_factor = self.p_scmax_el / self.y_int_el \
+            if self.y_int_el else 0
+
+    def _stage(self, name):
+        """result of the stage name, computed on first request"""
+        if name not in self._results:
+            if self._stages is not None:
+                self._results.update(self._stages((name,), **self.values))
+            else:
+                function, parameters, upstream = STAGES[name]
+                self._results[name] = function(
+                    **{p: self.values[p] for p in parameters},
+                    **{up: self._stage(up) for up in upstream})
+        return self._results[name]
+
+    def _plot(self, x, y):
+        """Plot of x and y in the precision of the curves"""
+        dtype = _DTYPES[self.values['precision']]
+        return Plot(x=np.asarray(x, dtype), y=np.asarray(y, dtype))
+
+    def __repr__(self):
+        return (f'GroundCurveResult(x_int={self.x_int}, y_int={self.y_int}, '
+                f'safety_factor={self.safety_factor})')
+
+    @property
+    def ground_curve(self):
+        """wall displacement [m] over the support pressure [MPa]"""
+        ground = self._stage('ground')
+        return self._plot(ground.x, ground.p_i / 1000)
+
+    @property
+    def plastic_radius(self):
+        """plastic radius [m] over the wall displacement [m]"""
+        ground = self._stage('ground')
+        return self._plot(ground.x, ground.r_p)
+
+    @property
+    def critical_point(self):
+        """wall displacement [m] and support pressure [MPa] at p_cr"""
+        return Plot(x=[self.x_cr], y=[self.p_cr / 1000])
+
+    @property
+    def support(self):
+        """support line of the hardening sprayed concrete [m, MPa]"""
+        s = self._stage('support')
+        return self._plot(s.x_support, s.y_support)
+
+    @property
+    def support_el(self):
+        """elastic-perfectly plastic support line [m, MPa]"""
+        s = self._stage('support')
+        return self._plot(s.x_support_el, s.y_support_el)
+
+    @property
+    def intersection(self):
+        """equilibrium point of support and ground curve (0 or 1 values)"""
+        s = self._stage('support')
+        return Plot(x=s.x_int, y=s.y_int)
+
+    @property
+    def intersection_el(self):
+        """equilibrium point of the elastic support line (0 or 1 values)"""
+        s = self._stage('support')
+        return Plot(x=s.x_int_el, y=s.y_int_el)
+
+    @property
+    def p_scmax(self):
+        """[MPa] - maximum support pressure over the first 28 days"""
+        return self._stage('scl').p_scmax
+
+    @property
+    def ldp(self):
+        """wall displacement [m] over the distance from the face [m]"""
+        ldp = self._stage('ldp')
+        return self._plot(ldp.u, ldp.x)
+
+    @property
+    def support_time(self):
+        """support pressure [MPa] over the age of the lining [days]"""
+        return self._plot(self._stage('scl').time[1:] / 24,
+                          self._stage('support').y_support)
+
+    @property
+    def scl_strength(self):
+        """strength of the sprayed concrete [MPa] over its age [days]"""
+        scl = self._stage('scl')
+        return self._plot(scl.time / 24, scl.sigma)
+
+    @property
+    def ldp_updated(self):
+        """LDP of the supported tunnel (wall displacement [m], distance
+        from the face [m])"""
+        family = self._stage('ldp_family')
+        if family is None:
+            return None
+        return self._plot(family.u_ix, family.x)
+
+    @property
+    def ldp_family(self):
+        """LDPs for the support pressures up to the equilibrium (an
+        LDPFamily) over the distance from the face [m]"""
+        family = self._stage('ldp_family')
+        if family is None:
+            return None
+        dtype = _DTYPES[self.values['precision']]
+        return Plot(x=family.family.astype(dtype),
+                    y=np.asarray(family.x, dtype))
+
+    @property
+    def ldp_support(self):
+        """wall displacement [m] and distance from the face [m] at which
+        the LDPs reach the support line"""
+        family = self._stage('ldp_family')
+        if family is None:
+            return None
+        return self._plot(family.x_l, family.y_l)
+
+    @property
+    def rate_of_flow(self):
+        """actual support pressure [MPa] over the time [days]"""
+        flow = self._stage('rate_of_flow')
+        if flow is None:
+            return None
+        return self._plot(flow.hours / 24, flow.sigma)
+
+
+def equilibrium(gamma=20, H=200, nu=0.3, E=1050000, D=5, c=1000, phi=28,
+                f_ck=20, E_c=5000, nu_c=0.20, t_c=0.2, dis_sup=2):
+    """
+    Scalar results of ground_curve without the plot arrays: the critical
+    point, the maximum displacement and plastic radius, the displacement at
+    support installation and the equilibrium points of the nonlinear (x_int,
+    y_int) and the elastic (x_int_el, y_int_el) support lines [m, MPa],
+    which are None if the support does not reach the ground curve.
+    The input values are the same as for ground_curve.
+    """
+    result = GroundCurveResult(dict(
+        gamma=gamma, H=H, nu=nu, E=E, D=D, c=c, phi=phi, f_ck=f_ck, E_c=E_c,
+        nu_c=nu_c, t_c=t_c, dis_sup=dis_sup))
+    return Equilibrium(*(getattr(result, name)
+                         for name in Equilibrium._fields))
+
+
+def ground_curve(gamma=20, H=200, nu=0.3, E=1050000, D=5, c=1000, phi=28,
+                 f_ck=20, E_c=5000, nu_c=0.20, t_c=0.2, dis_sup=2,
+                 advance_rate=5, tolerance=1e-5, precision=64):
+    """
+    # --------------------------------
+    # Input values for rock/soil
+    # --------------------------------
+    gamma        - [kN/m³] - specific weight of the rock mass
+    H            - [m]     - overburden
+    nu           - [-]     - Poisson's ratio of the rock
+    E            - [kPa]   - Modulus of elasticity of the rock
+    D            - [m]     - Diameter of the tunnel
+    c            - [kPa]   - Cohesion
+    phi          - [deg]   - Friction angle
+    # --------------------------------
+    # Input values for support members
+    # --------------------------------
+    f_ck         - [MPa]   - Uniaxial compressive strength of the
+                             sprayed concrete
+    E_c          - [MPa]   - Young's modulus of the sprayed concrete
+    nu_c         - [-]     - Poisson's ratio of the sprayed concrete
+    t_c          - [m]     - Thickness of the sprayed concrete
+    dis_sup      - [m]     - Distance of the support member to the face
+    advance_rate - [m/day] - Rate of advance
+    # --------------------------------
+    # Resolution of the curves
+    # --------------------------------
+    tolerance    - [m]     - Largest deviation of the sampled ground
+                             curve from the exact one; 0 samples 5000
+                             equidistant support pressures
+    precision    - [bit]   - Precision of the curves, 32 or 64; the
+                             arithmetic, the scalar values and the
+                             equilibrium points are of 64 bit always
+
+    Returns a GroundCurveResult; its curves are computed when read.
+    """
+    return GroundCurveResult(dict(
+        gamma=gamma, H=H, nu=nu, E=E, D=D, c=c, phi=phi, f_ck=f_ck, E_c=E_c,
+        nu_c=nu_c, t_c=t_c, dis_sup=dis_sup, advance_rate=advance_rate,
+        tolerance=tolerance, precision=precision))
+
+
+DEFAULTS = {name: parameter.default for name, parameter
+            in inspect.signature(ground_curve).parameters.items()}
+# default input values of ground_curve
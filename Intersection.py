@@ -5,32 +5,126 @@ Source: https://github.com/sukhbinder/intersection
 import numpy as np
 
 
-def _rect_inter_inner(x1, x2):
+MAX_BLOCK_BYTES = 2 ** 25
+# [bytes] - default budget for the temporaries of the general search
+
+PAIR_BYTES = 18
+# [bytes] - memory of one segment pair of a tile: two boolean masks and the
+# two int64 indices of np.nonzero, in case every pair is a candidate
+
+SOLVE_BYTES = 128
+# [bytes] - memory of one candidate pair in the closed-form solve (about 16
+# float temporaries)
+
+END_TOLERANCE = 1e-9
+# [-] - fraction of a segment by which an intersection may lie beyond its
+# ends: points at a vertex are found whatever the rounding of the solve
+
+
+def _bounds(x):
+    """lower and upper bound of every segment of a curve"""
+    return np.minimum(x[:-1], x[1:]), np.maximum(x[:-1], x[1:])
+
+
+def _rectangle_intersection_(x1, y1, x2, y2, max_bytes=MAX_BLOCK_BYTES):
+    """
+    Candidate segment pairs whose bounding boxes overlap. Curve 1 is cut
+    into tiles of rows so that the two boolean n_rows x n2 masks of a tile
+    and its indices of candidate pairs stay within max_bytes; tiles are
+    yielded in order as (ii, jj).
+    """
+    x1_min, x1_max = _bounds(x1)
+    y1_min, y1_max = _bounds(y1)
+    x2_min, x2_max = _bounds(x2)
+    y2_min, y2_max = _bounds(y2)
+    n1 = x1_min.shape[0]
+    n2 = x2_min.shape[0]
+    rows = int(max(1, max_bytes // (PAIR_BYTES * max(n2, 1))))
+
+    for start in range(0, n1, rows):
+        stop = min(start + rows, n1)
+        mask = np.less_equal(x1_min[start:stop, None], x2_max)
+        tmp = np.greater_equal(x1_max[start:stop, None], x2_min)
+        mask &= tmp
+        np.less_equal(y1_min[start:stop, None], y2_max, out=tmp)
+        mask &= tmp
+        np.greater_equal(y1_max[start:stop, None], y2_min, out=tmp)
+        mask &= tmp
+        del tmp
+        ii, jj = np.nonzero(mask)
+        del mask
+        ii += start
+        yield ii, jj
+
+
+def _is_monotone(x):
+    """True if x is strictly increasing or strictly decreasing (no NaNs)"""
+    dx = np.diff(x)
+    return dx.shape[0] > 0 and bool(np.all(dx > 0) or np.all(dx < 0))
+
+
+def _monotone_pairs(x1, x2):
+    """
+    Candidate segment pairs of two curves which are strictly monotone in x.
+    A merge/searchsorted sweep over the sorted vertices returns only the
+    pairs whose x-ranges overlap, at most n1 + n2 of them, ordered like
+    np.nonzero over the full n1 x n2 overlap matrix.
+    """
     n1 = x1.shape[0] - 1
     n2 = x2.shape[0] - 1
-    X1 = np.c_[x1[:-1], x1[1:]]
-    X2 = np.c_[x2[:-1], x2[1:]]
-    S1 = np.tile(X1.min(axis=1), (n2, 1)).T
-    S2 = np.tile(X2.max(axis=1), (n1, 1))
-    S3 = np.tile(X1.max(axis=1), (n2, 1)).T
-    S4 = np.tile(X2.min(axis=1), (n1, 1))
-    return S1, S2, S3, S4
+    flip1 = x1[0] > x1[-1]
+    flip2 = x2[0] > x2[-1]
+    a = x1[::-1] if flip1 else x1
+    b = x2[::-1] if flip2 else x2
 
+    # segment i of a covers [a[i], a[i+1]], segment j of b [b[j], b[j+1]]
+    j_lo = np.searchsorted(b, a[:-1], side='left') - 1
+    j_hi = np.searchsorted(b, a[1:], side='right') - 1
+    j_lo = np.clip(j_lo, 0, n2 - 1)
+    j_hi = np.clip(j_hi, -1, n2 - 1)
+    counts = np.maximum(j_hi - j_lo + 1, 0)
 
-def _rectangle_intersection_(x1, y1, x2, y2):
-    S1, S2, S3, S4 = _rect_inter_inner(x1, x2)
-    S5, S6, S7, S8 = _rect_inter_inner(y1, y2)
+    ii = np.repeat(np.arange(n1), counts)
+    offsets = np.arange(ii.shape[0]) - np.repeat(np.cumsum(counts) - counts,
+                                                 counts)
+    jj = np.repeat(j_lo, counts) + offsets
 
-    C1 = np.less_equal(S1, S2)
-    C2 = np.greater_equal(S3, S4)
-    C3 = np.less_equal(S5, S6)
-    C4 = np.greater_equal(S7, S8)
+    # map back to the original segment numbering and ordering
+    if flip1:
+        ii = n1 - 1 - ii
+    if flip2:
+        jj = n2 - 1 - jj
+    order = np.lexsort((jj, ii))
+    return ii[order], jj[order]
 
-    ii, jj = np.nonzero(C1 & C2 & C3 & C4)
-    return ii, jj
 
+def _segment_intersection(x1, y1, x2, y2, ii, jj):
+    """
+    Closed-form (Cramer's rule) solve of all candidate segment pairs at
+    once. Parallel segments have a zero determinant and are dropped. An
+    intersection at a vertex shared by two segments is found on both.
+    """
+    dx1 = x1[ii + 1] - x1[ii]
+    dy1 = y1[ii + 1] - y1[ii]
+    dx2 = x2[jj + 1] - x2[jj]
+    dy2 = y2[jj + 1] - y2[jj]
+    rx = x2[jj] - x1[ii]
+    ry = y2[jj] - y1[ii]
 
-def intersection(x1, y1, x2, y2):
+    det = dx2 * dy1 - dx1 * dy2
+    valid = det != 0
+    det = np.where(valid, det, 1)
+    t = (dx2 * ry - dy2 * rx) / det  # position along segment of curve 1
+    s = (dx1 * ry - dy1 * rx) / det  # position along segment of curve 2
+
+    lo, hi = -END_TOLERANCE, 1 + END_TOLERANCE
+    in_range = valid & (t >= lo) & (s >= lo) & (t <= hi) & (s <= hi)
+    t = t[in_range]
+    return (x1[ii[in_range]] + t * dx1[in_range],
+            y1[ii[in_range]] + t * dy1[in_range])
+
+
+def intersection(x1, y1, x2, y2, monotone=None, max_bytes=MAX_BLOCK_BYTES):
     """
     Intersections of curves.
        Computes the (x,y) locations where two curves intersect.  The curves
@@ -49,35 +143,33 @@ def intersection(x1, y1, x2, y2):
     plt.plot(x2,y2,c='g')
     plt.plot(x,y,'*k')
     plt.show()
+
+    monotone - if True both curves are taken to be strictly monotone in x
+               and the O(n1 + n2) sweep is used; if None (default) this is
+               detected, if False the general n1 x n2 search is always used
+    max_bytes - [bytes] memory budget of the temporaries of the general
+                search: half for a tile of the n1 x n2 bounding box test
+                and its candidate pairs, half for their solve; the arrays
+                of the intersections found come on top
     """
-    ii, jj = _rectangle_intersection_(x1, y1, x2, y2)
-    n = len(ii)
-
-    dxy1 = np.diff(np.c_[x1, y1], axis=0)
-    dxy2 = np.diff(np.c_[x2, y2], axis=0)
-
-    T = np.zeros((4, n))
-    AA = np.zeros((4, 4, n))
-    AA[0:2, 2, :] = -1
-    AA[2:4, 3, :] = -1
-    AA[0::2, 0, :] = dxy1[ii, :].T
-    AA[1::2, 1, :] = dxy2[jj, :].T
-
-    BB = np.zeros((4, n))
-    BB[0, :] = -x1[ii].ravel()
-    BB[1, :] = -x2[jj].ravel()
-    BB[2, :] = -y1[ii].ravel()
-    BB[3, :] = -y2[jj].ravel()
-
-    for i in range(n):
-        try:
-            T[:, i] = np.linalg.solve(AA[:, :, i], BB[:, i])
-        except:
-            T[:, i] = np.NaN
-
-    in_range = (T[0, :] >= 0) & (T[1, :] >= 0) & (T[0, :] <= 1) & (
-                T[1, :] <= 1)
-
-    xy0 = T[2:, in_range]
-    xy0 = xy0.T
-    return xy0[:, 0], xy0[:, 1]
+    x1, y1, x2, y2 = (np.asarray(a, dtype=float) for a in (x1, y1, x2, y2))
+    if monotone is None:
+        monotone = _is_monotone(x1) and _is_monotone(x2)
+    if monotone:
+        ii, jj = _monotone_pairs(x1, x2)
+        return _segment_intersection(x1, y1, x2, y2, ii, jj)
+
+    # closed-form solve in chunks of candidate pairs so that a dense tile
+    # stays within the budget too
+    chunk = int(max(1, max_bytes // 2 // SOLVE_BYTES))
+    xs, ys = [], []
+    for ii, jj in _rectangle_intersection_(x1, y1, x2, y2, max_bytes // 2):
+        for start in range(0, ii.shape[0], chunk):
+            x, y = _segment_intersection(x1, y1, x2, y2,
+                                         ii[start:start + chunk],
+                                         jj[start:start + chunk])
+            xs.append(x)
+            ys.append(y)
+    if not xs:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(xs), np.concatenate(ys)
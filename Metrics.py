@@ -0,0 +1,164 @@
+"""
+Operational metrics of the app in the Prometheus text format
+Every worker process of the server counts in its own Registry and writes it
+to a file of a directory shared by all workers; the scrape of /metrics,
+answered by any one worker, reads the files of all live workers and reports
+each with the label worker (its process id).
+"""
+from collections import namedtuple
+from Cache import private_directory
+import bisect
+import json
+import os
+import tempfile
+import threading
+import psutil
+
+
+Metric = namedtuple('Metric', 'type help')
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1., 2.5, 5., 10.)
+# [s] - upper bounds of the buckets of the histograms
+
+DUMP_INTERVAL = 1.
+# [s] - a worker writes its file this long after a change (and on a scrape)
+
+
+class Registry:
+    """
+    Counters, gauges and histograms of one process, each identified by its
+    name and labels. A process forked from the one which made the registry
+    (a worker of a preloaded server, a background job) starts empty.
+    metrics - dict name -> Metric of all names used
+    path    - directory of the files of all workers (created if missing;
+              PermissionError if it is owned by another user or writable
+              by others)
+    collect - function updating gauges (e.g. the memory) before every write
+    """
+
+    def __init__(self, metrics, path, collect=None):
+        self.metrics = metrics
+        self.path = path
+        self.collect = collect
+        private_directory(path)
+        self.pid = os.getpid()
+        self._values = {}  # (name, labels) -> value or histogram buckets
+        self._lock = threading.Lock()
+        self._timer = None  # of the next write
+
+    def _update(self, name, labels, update):
+        """set the value of name and labels to update(value or None)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if self.pid != os.getpid():
+                self.pid, self._values, self._timer = os.getpid(), {}, None
+            self._values[key] = update(self._values.get(key))
+            if self._timer is None:
+                self._timer = threading.Timer(DUMP_INTERVAL, self.dump)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def inc(self, name, value=1, **labels):
+        """add value to the counter (or gauge) name"""
+        self._update(name, labels, lambda old: (old or 0) + value)
+
+    def set(self, name, value, **labels):
+        """set the gauge name"""
+        self._update(name, labels, lambda old: value)
+
+    def maximum(self, name, value, **labels):
+        """raise the gauge name to value if it is lower"""
+        self._update(name, labels,
+                     lambda old: value if old is None else max(old, value))
+
+    def observe(self, name, value, **labels):
+        """count value in the histogram name"""
+        def update(histogram):
+            # counts per bucket (the last above all bounds), sum
+            if histogram is None:
+                histogram = [0] * (len(BUCKETS) + 1) + [0.]
+            histogram[bisect.bisect_left(BUCKETS, value)] += 1
+            histogram[-1] += value
+            return histogram
+        self._update(name, labels, update)
+
+    def _file_name(self, pid):
+        return os.path.join(self.path, f'{pid}.json')
+
+    def dump(self):
+        """write the metrics to the file of the process"""
+        if self.collect is not None:
+            self.collect(self)
+        with self._lock:
+            self._timer = None
+            if self.pid != os.getpid():
+                return  # nothing recorded since the fork
+            data = json.dumps([[name, dict(labels), value] for
+                               (name, labels), value in self._values.items()])
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+        os.replace(tmp, self._file_name(self.pid))
+
+    def _workers(self):
+        """pid -> metrics of all live workers; the files of dead ones are
+        removed"""
+        workers = {}
+        for entry in os.scandir(self.path):
+            pid = entry.name[:-len('.json')]
+            if not (entry.name.endswith('.json') and pid.isdigit()):
+                continue
+            if not psutil.pid_exists(int(pid)):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            try:
+                with open(entry.path) as f:
+                    workers[pid] = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+        return workers
+
+    def exposition(self):
+        """the metrics of all workers in the Prometheus text format"""
+        self.dump()
+        samples = {name: [] for name in self.metrics}
+        for pid, values in sorted(self._workers().items()):
+            for name, labels, value in values:
+                if name in samples:
+                    samples[name].append((dict(labels, worker=pid), value))
+
+        lines = []
+        for name, (kind, text) in self.metrics.items():
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples[name]:
+                if kind != 'histogram':
+                    lines.append(f'{name}{_labels(labels)} {value}')
+                    continue
+                total = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), value[:-1]):
+                    total += count
+                    lines.append(f'{name}_bucket'
+                                 f'{_labels(dict(labels, le=bound))} {total}')
+                lines.append(f'{name}_sum{_labels(labels)} {value[-1]}')
+                lines.append(f'{name}_count{_labels(labels)} {total}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    """labels in the text format: {name="value",...}"""
+    if not labels:
+        return ''
+    text = ','.join('{}="{}"'.format(name, str(value).replace(
+        '\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items())
+    return '{' + text + '}'
+
+
+def rss():
+    """resident memory of the process [bytes]"""
+    return psutil.Process().memory_info().rss
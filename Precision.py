@@ -0,0 +1,67 @@
+"""
+Accuracy of the 32 bit curves of ground_curve
+The curves of ground_curve(precision=32) are compared with those of the
+64 bit reference over a set of cases, e.g. before using the smaller curves
+in a sweep or in the app.
+"""
+from collections import namedtuple
+from Batch import _columns
+from Ground_Curve import ground_curve
+from Sweep import CURVES
+import warnings
+import numpy as np
+
+
+Accuracy = namedtuple('Accuracy', 'max_abs max_rel nbytes_64 nbytes_32')
+
+
+def accuracy(cases=None, curves=CURVES, **params):
+    """
+    Largest deviation of the 32 bit curves from the 64 bit ones.
+    cases  - input values as for Batch.ground_curve_batch, the defaults of
+             ground_curve if None
+    curves - names of the curves compared (see Sweep.CURVES)
+    params - input values as keywords
+    Returns a dict curve name -> Accuracy with the largest absolute
+    deviation (in the unit of the curve), the largest deviation relative
+    to the largest magnitude of the curve, both over x, y and all cases,
+    and the total size of the curve in bytes in both precisions. Cases
+    for which ground_curve fails are skipped.
+    """
+    params.pop('precision', None)
+    columns = _columns(cases, params)
+    columns.pop('precision')
+    max_abs = dict.fromkeys(curves, 0.)
+    max_rel = dict.fromkeys(curves, 0.)
+    nbytes = {name: [0, 0] for name in curves}
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore')
+        for i in range(len(columns['gamma'])):
+            values = {name: v[i].item() for name, v in columns.items()}
+            try:
+                result_64 = ground_curve(**values, precision=64)
+                result_32 = ground_curve(**values, precision=32)
+                pairs = [(getattr(result_64, name), getattr(result_32, name))
+                         for name in curves]
+            except (ArithmeticError, ValueError):
+                continue
+            for name, (curve_64, curve_32) in zip(curves, pairs):
+                if curve_64 is None:
+                    continue
+                for a, b in zip(curve_64, curve_32):
+                    a, b = np.asarray(a), np.asarray(b)
+                    nbytes[name][0] += a.nbytes
+                    nbytes[name][1] += b.nbytes
+                    finite = np.isfinite(a)
+                    if not finite.any():
+                        continue
+                    a, b = a[finite], b[finite].astype(float)
+                    deviation = np.max(np.abs(b - a))
+                    scale = np.max(np.abs(a))
+                    max_abs[name] = max(max_abs[name], deviation)
+                    if scale > 0:
+                        max_rel[name] = max(max_rel[name], deviation / scale)
+    return {name: Accuracy(max_abs=max_abs[name], max_rel=max_rel[name],
+                           nbytes_64=nbytes[name][0],
+                           nbytes_32=nbytes[name][1])
+            for name in curves}
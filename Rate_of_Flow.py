@@ -7,8 +7,30 @@ def rate_of_flow(disp_array_2d: typing.NamedTuple, rate: float):
     calculated by the ground curve"""
 
     wall_disp, dist_to_face = disp_array_2d
-    arr_disp = wall_disp - wall_disp[0]
-    arr_dist_to_scl = dist_to_face - dist_to_face[0]
+    sigma_actual, arr_hours = rate_of_flow_batch(wall_disp, dist_to_face,
+                                                 rate)
+    return sigma_actual[0], arr_hours[0]
+
+
+def rate_of_flow_batch(wall_disp: np.ndarray, dist_to_face: np.ndarray,
+                       rate: typing.Union[float, np.ndarray]):
+    """rate_of_flow for many scenarios at once
+
+    wall_disp and dist_to_face [m] have the shape (n_scenarios, n_steps)
+    or (n_steps,), rate [m/day] is a scalar or of shape (n_scenarios,);
+    they are broadcast against each other, e.g. one displacement history
+    and an array of advance rates. The recurrence advances all scenarios
+    with one array operation per time step. Returns the stresses of the
+    scl [MPa] and the times [h], both of shape (n_scenarios, n_steps)."""
+
+    wall_disp = np.atleast_2d(np.asarray(wall_disp, dtype=float))
+    dist_to_face = np.atleast_2d(np.asarray(dist_to_face, dtype=float))
+    rate = np.reshape(np.asarray(rate, dtype=float), (-1, 1))
+    wall_disp, dist_to_face, rate = np.broadcast_arrays(wall_disp,
+                                                        dist_to_face, rate)
+
+    arr_disp = wall_disp - wall_disp[:, :1]
+    arr_dist_to_scl = dist_to_face - dist_to_face[:, :1]
     # subtract the initial displacement of the wall and the initial
     # displacement of the scl to set it zero
 
@@ -16,8 +38,6 @@ def rate_of_flow(disp_array_2d: typing.NamedTuple, rate: float):
     arr_days = arr_dist_to_scl / rate
     arr_hours = arr_days * 24
 
-    del_eps = arr_disp[1:] - arr_disp[:-1]
-
     # Constants for rate of flow calculation
     E_28 = 15000  # [MPa]
     A = 0.0001  # [1/MPa*d^(1/3)]
@@ -42,33 +62,41 @@ def rate_of_flow(disp_array_2d: typing.NamedTuple, rate: float):
     # strains due to shrinkage
     eps_sh = eps_sh_inf * arr_days / (arr_days + B)
 
-    sigma_2 = [0]
-    eps_d = [0]
-    for i, _ in enumerate(arr_days):
-        try:
-            if i == 0:
-                value_eps_d = 0
-                eps_d.append(value_eps_d)
-                value_sigma_2 = 0
-                sigma_2.append(value_sigma_2)
-            else:
-                del_eps_sh = eps_sh[i] - eps_sh[i-1]
-                del_eps_t = eps_t[i] - eps_t[i-1]
-                del_C_t = C_t[i] - C_t[i-1]
-                value_eps_d = (sigma_2[i - 1] * C_d_inf - eps_d[i - 1]) * (
-                            1 - np.exp(-del_C_t / Q))
-                eps_d.append(value_eps_d)
-                value_sigma_2 = ((del_eps[i] - del_eps_sh - del_eps_t
-                                  + eps_d[i - 1] * (1 - np.exp(-del_C_t /
-                                                               Q)) +
-                                  sigma_2[i - 1] / E_t[i]) / (C_d_inf * (
-                        1 - np.exp(-del_C_t / Q)) + del_C_t + (1 /E_t[i])
-                                                              )
-                                 )
-                sigma_2.append(value_sigma_2)
-        except IndexError:
-            pass
-
-    sigma_actual = np.array(sigma_2)
-
-    return sigma_actual, arr_hours
\ No newline at end of file
+    # increments of the time steps i = 1 ... n_steps - 2, column i - 1
+    # (the last time step has no following displacement increment)
+    n_steps = arr_days.shape[1]
+    del_eps = np.diff(arr_disp, axis=1)[:, 1:]
+    del_eps_sh = np.diff(eps_sh, axis=1)[:, :-1]
+    del_eps_t = np.diff(eps_t, axis=1)[:, :-1]
+    del_C_t = np.diff(C_t, axis=1)[:, :-1]
+    E_t = E_t[:, 1:-1]
+
+    creep = 1 - np.exp(-del_C_t / Q)
+    load = del_eps - del_eps_sh - del_eps_t
+    compliance = C_d_inf * creep + del_C_t + (1 / E_t)
+
+    # time steps along the first axis, scenarios along the second; a single
+    # scenario is stepped on python floats, which is faster than numpy rows
+    # of length one and gives the same values
+    n_scenarios = arr_days.shape[0]
+    if n_scenarios == 1:
+        creep, load, compliance, E_t = (a[0].tolist() for a in (
+            creep, load, compliance, E_t))
+        sigma_2 = [0.] * n_steps
+        eps_d = [0.] * n_steps
+    else:
+        creep, load, compliance, E_t = (np.ascontiguousarray(a.T) for a in (
+            creep, load, compliance, E_t))
+        sigma_2 = np.zeros((n_steps, n_scenarios))
+        eps_d = np.zeros_like(sigma_2)
+
+    # step i updates index i + 1 from index i - 1: the first two stresses
+    # are zero and the recurrence alternates between two chains
+    for j in range(n_steps - 2):
+        eps_d[j + 2] = (sigma_2[j] * C_d_inf - eps_d[j]) * creep[j]
+        sigma_2[j + 2] = (load[j] + eps_d[j] * creep[j]
+                          + sigma_2[j] / E_t[j]) / compliance[j]
+
+    sigma_actual = np.reshape(sigma_2, (n_steps, n_scenarios)).T
+
+    return sigma_actual, arr_hours
@@ -0,0 +1,182 @@
+"""
+Probabilistic safety factor of the support
+The uncertain input values are sampled by Latin hypercube sampling (with
+rank correlation after Iman & Conover), the equilibrium is evaluated with
+Batch.ground_curve_batch in large batches, and sampling stops as soon as the
+confidence interval of the failure probability is narrow enough.
+"""
+from collections import namedtuple
+from Batch import ground_curve_batch, _columns
+import numpy as np
+
+
+Reliability = namedtuple('Reliability', 'p_failure ci_low ci_high n_samples '
+                                        'n_invalid safety_factor samples')
+
+
+def _norm_ppf(u):
+    """
+    Inverse of the standard normal distribution function (rational
+    approximation by P. J. Acklam, relative error below 1.2e-9)
+    """
+    a = (-3.969683028665376e+01, 2.209460984245205e+02,
+         -2.759285104469687e+02, 1.383577518672690e+02,
+         -3.066479806614716e+01, 2.506628277459239e+00)
+    b = (-5.447609879822406e+01, 1.615858368580409e+02,
+         -1.556989798598866e+02, 6.680131188771972e+01,
+         -1.328068155288572e+01)
+    c = (-7.784894002430293e-03, -3.223964580411365e-01,
+         -2.400758277161838e+00, -2.549732539343734e+00,
+         4.374664141464968e+00, 2.938163982698783e+00)
+    d = (7.784695709041462e-03, 3.224671290700398e-01,
+         2.445134137142996e+00, 3.754408661907416e+00)
+
+    u = np.asarray(u, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # central region
+        q = u - 0.5
+        r = q * q
+        central = (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4])
+                   * r + a[5]) * q / (((((b[0] * r + b[1]) * r + b[2]) * r
+                                        + b[3]) * r + b[4]) * r + 1)
+        # tails
+        q = np.sqrt(-2 * np.log(np.minimum(u, 1 - u)))
+        tail = (((((c[0] * q + c[1]) * q + c[2]) * q + c[3]) * q + c[4]) * q
+                + c[5]) / ((((d[0] * q + d[1]) * q + d[2]) * q + d[3]) * q
+                           + 1)
+    tail = np.where(u < 0.5, tail, -tail)
+    return np.where(np.abs(u - 0.5) <= 0.47575, central, tail)
+
+
+def uniform(low, high):
+    """inverse distribution function of a uniform distribution"""
+    return lambda u: low + (high - low) * u
+
+
+def normal(mean, std):
+    """inverse distribution function of a normal distribution"""
+    return lambda u: mean + std * _norm_ppf(u)
+
+
+def lognormal(mean, std):
+    """
+    inverse distribution function of a lognormal distribution with the
+    given mean and standard deviation (of the value, not of its log),
+    e.g. for the cohesion or the Young's modulus, which must be positive
+    """
+    sigma = np.sqrt(np.log(1 + (std / mean) ** 2))
+    mu = np.log(mean) - sigma ** 2 / 2
+    return lambda u: np.exp(mu + sigma * _norm_ppf(u))
+
+
+def latin_hypercube(n, d, correlation=None, rng=None):
+    """
+    n samples of d variables, uniform on (0, 1), one per stratum of width
+    1 / n in every variable. With a correlation matrix (d x d) the samples
+    of every variable are reordered (Iman & Conover) so that their normal
+    scores have approximately this correlation; the strata are kept.
+    """
+    rng = np.random.default_rng(rng)
+    u = (rng.permuted(np.tile(np.arange(n), (d, 1)), axis=1).T
+         + rng.random((n, d))) / n
+    if correlation is None or d < 2:
+        return u
+
+    # normal scores with exactly the target correlation
+    z = rng.standard_normal((n, d))
+    z = z @ np.linalg.inv(np.linalg.cholesky(np.corrcoef(z, rowvar=False))).T
+    z = z @ np.linalg.cholesky(np.asarray(correlation, dtype=float)).T
+    # give every column of u the ranks of the scores
+    ranks = np.argsort(np.argsort(z, axis=0), axis=0)
+    return np.take_along_axis(np.sort(u, axis=0), ranks, axis=0)
+
+
+def valid(cases=None, **params):
+    """
+    whether the input values of the cases (as for Batch.ground_curve_batch)
+    make physical sense: positive unit weight, depth, moduli, diameter,
+    strength and thickness, Poisson's ratios in (0, 0.5), cohesion and
+    distance of the support >= 0, friction angle in (0, 90) degrees
+    """
+    v = _columns(cases, params)
+    positive = ('gamma', 'H', 'E', 'D', 'f_ck', 'E_c', 't_c')
+    ok = np.logical_and.reduce([v[name] > 0 for name in positive])
+    for name in ('nu', 'nu_c'):
+        ok &= (v[name] > 0) & (v[name] < 0.5)
+    return ok & (v['c'] >= 0) & (v['dis_sup'] >= 0) & (v['phi'] > 0) & (
+        v['phi'] < 90)
+
+
+def _wilson(failures, n, z):
+    """Wilson score interval of a binomial proportion"""
+    p = failures / n
+    centre = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+    half = z / (1 + z ** 2 / n) * np.sqrt(
+        p * (1 - p) / n + z ** 2 / (4 * n ** 2))
+    return centre - half, centre + half
+
+
+def reliability(distributions, correlation=None, fs_min=1.0, ci_width=0.01,
+                confidence=0.95, batch_size=10000, max_samples=1000000,
+                seed=None, **params):
+    """
+    Distribution of the safety factor of the elastic support (F.S. of the
+    app) and the probability of support failure, F.S. < fs_min. As in the
+    app the F.S. is 0 if the support does not reach equilibrium. Samples
+    which make no physical sense (see valid), e.g. a negative modulus drawn
+    from an unbounded normal distribution, are counted as invalid: their
+    F.S. is NaN and they do not enter the failure probability.
+    distributions - dict of the uncertain input values of ground_curve,
+                    e.g. {'c': lognormal(1000, 300), 'phi': normal(28, 2),
+                    'E': lognormal(1.05e6, 3e5), 'H': uniform(180, 220)};
+                    each value is an inverse distribution function
+    correlation   - correlation matrix of the uncertain values, in the order
+                    of distributions (rank correlation after Iman & Conover)
+    ci_width      - sampling stops when the confidence interval of the
+                    failure probability (Wilson) is at most this wide ...
+    confidence    - ... at this confidence level
+    batch_size    - samples per Latin hypercube batch, evaluated at once
+    max_samples   - ... or when this many samples have been evaluated
+    params        - the fixed input values (default as in ground_curve)
+    Returns a Reliability with p_failure (of the valid samples, NaN if
+    there are none), its confidence interval, the number of samples, the
+    number of invalid ones, the safety factor of every sample and the
+    samples.
+    """
+    names = list(distributions)
+    fixed = set(names) & set(params)
+    if fixed:
+        raise ValueError(f'{sorted(fixed)} are both uncertain and fixed')
+
+    rng = np.random.default_rng(seed)
+    z = _norm_ppf(0.5 + confidence / 2)
+    safety_factor = []
+    samples = {name: [] for name in names}
+    failures = n = n_valid = 0
+    ci_low, ci_high = 0., 1.
+    while n < max_samples:
+        size = min(batch_size, max_samples - n)
+        u = latin_hypercube(size, len(names), correlation, rng)
+        cases = {name: distributions[name](u[:, i])
+                 for i, name in enumerate(names)}
+        fs = ground_curve_batch(cases, **params)['safety_factor']
+        ok = valid(cases, **params)
+        fs[~ok] = np.nan
+
+        safety_factor.append(fs)
+        for name in names:
+            samples[name].append(cases[name])
+        failures += np.count_nonzero(fs[ok] < fs_min)
+        n += size
+        n_valid += np.count_nonzero(ok)
+        if n_valid:
+            ci_low, ci_high = _wilson(failures, n_valid, z)
+            if ci_high - ci_low <= ci_width:
+                break
+
+    return Reliability(p_failure=failures / n_valid if n_valid else np.nan,
+                       ci_low=ci_low, ci_high=ci_high, n_samples=n,
+                       n_invalid=n - n_valid,
+                       safety_factor=np.concatenate(safety_factor),
+                       samples={name: np.concatenate(v)
+                                for name, v in samples.items()})
@@ -0,0 +1,186 @@
+"""
+Lookup tables of the scalar results of ground_curve
+A table holds the results of Batch.ground_curve_batch on a grid of some of
+the input values (the others fixed) and answers queries inside the grid by
+multilinear interpolation, in about 15 microseconds instead of the
+0.14 ms of Ground_Curve.equilibrium. Every cell of the grid carries an
+estimate of its interpolation error; queries which the table cannot
+answer accurately enough are computed exactly.
+"""
+from Batch import ground_curve_batch, _columns
+from Ground_Curve import Equilibrium, equilibrium
+from Sweep import grid
+import bisect
+import inspect
+import numpy as np
+
+
+DEFAULTS = {name: p.default for name, p in
+            inspect.signature(equilibrium).parameters.items()}
+# input values of the scalar results and their defaults
+
+
+class Surrogate:
+    """
+    Scalar results of ground_curve interpolated in a table (made by build).
+    A query is computed exactly by Ground_Curve.equilibrium if
+    - it is outside the grid or differs from the table in a fixed value,
+    - its cell straddles the edge of the equilibrium (the support does not
+      reach the ground curve at a corner or the centre of the cell), or
+    - the estimated error of its cell exceeds rtol in any result.
+    The error estimate of a cell is the larger of the deviation of the
+    interpolation from the exact results at its centre and the bound of the
+    interpolation error, the sum over the axes of the second difference / 8,
+    at its corners, relative to the largest magnitude of the result at the
+    corners and the centre. It is an estimate, not a strict bound: a result
+    which bends within a cell much more than at its corners and its centre
+    may deviate more.
+    axes   - dict name -> increasing grid values of the input values varied
+    fixed  - dict name -> the other input values
+    table  - the results on the grid, a structured array of the fields of
+             Equilibrium of shape (len(axis) for axis in axes)
+    error  - estimated relative error of the cells, an array of shape
+             (len(axis) - 1 for axis in axes) per field of Equilibrium
+    rtol   - largest estimated error of the results interpolated
+    """
+
+    def __init__(self, axes, fixed, table, error, rtol=1e-3):
+        self.axes = {name: np.asarray(v, dtype=float)
+                     for name, v in axes.items()}
+        self.fixed = dict(fixed)
+        self.table = table
+        self.error = error
+        self.rtol = rtol
+        self._nodes = [v.tolist() for v in self.axes.values()]
+        self._values = np.stack([table[name] for name in Equilibrium._fields],
+                                axis=-1)
+        self.interpolated = self.exact = 0
+        # queries answered by the table and by equilibrium
+
+    @property
+    def rtol(self):
+        return self._rtol
+
+    @rtol.setter
+    def rtol(self, rtol):
+        self._rtol = rtol
+        self._accurate = np.all([e <= rtol for e in self.error.values()],
+                                axis=0)
+        # cells of which all results are interpolated
+
+    def __call__(self, **values):
+        """
+        Equilibrium for the input values (those of equilibrium, missing ones
+        take the values of the table or the defaults), interpolated if
+        possible
+        """
+        values = {**DEFAULTS, **self.fixed, **values}
+        cell, fractions = [], []
+        for nodes, name in zip(self._nodes, self.axes):
+            value = values[name]
+            i = bisect.bisect_right(nodes, value) - 1
+            if i == len(nodes) - 1 and value == nodes[-1]:
+                i -= 1
+            if not 0 <= i < len(nodes) - 1:
+                break
+            cell.append(i)
+            fractions.append((value - nodes[i]) / (nodes[i + 1] - nodes[i]))
+        else:
+            if (self._accurate[tuple(cell)]
+                    and all(values[name] == value
+                            for name, value in self.fixed.items())):
+                block = self._values[tuple(slice(i, i + 2) for i in cell)]
+                for t in fractions:
+                    block = block[0] + t * (block[1] - block[0])
+                self.interpolated += 1
+                return Equilibrium(*block.tolist())
+        self.exact += 1
+        return equilibrium(**{name: values[name] for name in DEFAULTS})
+
+    def save(self, file_name):
+        """write the table to an npz file, which load reads back"""
+        arrays = {'rtol': self.rtol}
+        arrays.update({'axis_' + name: v for name, v in self.axes.items()})
+        arrays.update({'fixed_' + name: v for name, v in self.fixed.items()})
+        arrays.update({'table_' + name: self.table[name]
+                       for name in Equilibrium._fields})
+        arrays.update({'error_' + name: v for name, v in self.error.items()})
+        np.savez(file_name, **arrays)
+
+
+def load(file_name):
+    """Surrogate written by Surrogate.save"""
+    with np.load(file_name) as data:
+        parts = {'axis': {}, 'fixed': {}, 'table': {}, 'error': {}}
+        for key in data.files:
+            if key != 'rtol':
+                kind, name = key.split('_', 1)
+                parts[kind][name] = data[key]
+        rtol = data['rtol'].item()
+    shape = tuple(len(v) for v in parts['axis'].values())
+    table = np.empty(shape, dtype=[(name, float)
+                                   for name in Equilibrium._fields])
+    for name, v in parts['table'].items():
+        table[name] = v
+    return Surrogate(parts['axis'], {name: v.item()
+                                     for name, v in parts['fixed'].items()},
+                     table, parts['error'], rtol)
+
+
+def _corners(values):
+    """values at the 2 ** ndim corners of every cell of the grid"""
+    corners = [values]
+    for axis in range(values.ndim):
+        corners = [c[(slice(None),) * axis + (part,)] for c in corners
+                   for part in (slice(None, -1), slice(1, None))]
+    return corners
+
+
+def build(axes, rtol=1e-3, **params):
+    """
+    Table of the scalar results of ground_curve on the grid of axes, e.g.
+    build({'H': np.linspace(10, 1000, 100), 'c': np.linspace(0, 3000, 61)},
+    phi=30). The results are computed by ground_curve_batch at every node
+    of the grid and at the centre of every cell, for the error estimate;
+    both grow with the product of the lengths of the axes, so a table
+    should only vary the few input values of a study.
+    axes   - dict name -> increasing grid values of an input value
+    rtol   - largest estimated relative error of interpolated results
+    params - the fixed input values (default as in ground_curve)
+    """
+    varied = set(axes) & set(params)
+    if varied:
+        raise ValueError(f'{sorted(varied)} are both varied and fixed')
+    unknown = set(axes) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f'{sorted(unknown)} do not enter the results')
+    axes = {name: np.asarray(v, dtype=float) for name, v in axes.items()}
+    shape = tuple(len(v) for v in axes.values())
+    fixed = {name: v[0].item() for name, v in _columns(None, params).items()
+             if name in DEFAULTS and name not in axes}
+
+    table = ground_curve_batch(grid(**axes), **fixed).reshape(shape)
+    centres = ground_curve_batch(
+        grid(**{name: (v[1:] + v[:-1]) / 2 for name, v in axes.items()}),
+        **fixed).reshape(tuple(n - 1 for n in shape))
+
+    error = {}
+    for name in Equilibrium._fields:
+        values = table[name]
+        # interpolation at the centres: the mean of the corners
+        deviation = np.abs(np.mean(_corners(values), axis=0) - centres[name])
+        # bound of the interpolation error of the curvature at the nodes,
+        # which also catches a kink between the corners and the centre
+        curvature = np.zeros(shape)
+        for axis, n in enumerate(shape):
+            if n > 2:
+                d2 = np.abs(np.diff(values, 2, axis=axis)) / 8
+                curvature += np.concatenate(
+                    [d2.take([0], axis), d2, d2.take([-1], axis)], axis)
+        scale = np.max(np.abs(_corners(values) + [centres[name]]), axis=0)
+        with np.errstate(all='ignore'):
+            deviation = np.maximum(
+                deviation, np.max(_corners(curvature), axis=0)) / scale
+            deviation[scale == 0] = 0
+        error[name] = np.where(np.isnan(deviation), np.inf, deviation)
+    return Surrogate(axes, fixed, table, error, rtol)
@@ -0,0 +1,174 @@
+"""
+Parametric sweeps of ground_curve over a process pool
+The cases are cut into chunks which are evaluated in parallel and written to
+disk as soon as they finish (one npz file per chunk). Running an interrupted
+sweep again with the same cases only evaluates the missing chunks.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from Batch import ground_curve_batch, _columns
+from Ground_Curve import ground_curve
+import glob
+import os
+import warnings
+import numpy as np
+
+
+CURVES = ('ground_curve', 'support', 'support_el', 'ldp', 'support_time',
+          'plastic_radius', 'ldp_updated', 'ldp_support', 'rate_of_flow',
+          'scl_strength')
+# curves of Ground_Curve.GroundCurveResult which can be stored per case; the
+# last four only exist if the support meets the ground curve
+
+
+def grid(**values):
+    """
+    Cartesian product of the given parameter values, e.g.
+    grid(H=np.arange(100, 1001, 100), c=[500, 1000]), as a dict of 1D arrays
+    which can be passed to sweep as cases
+    """
+    mesh = np.meshgrid(*(np.atleast_1d(v) for v in values.values()),
+                       indexing='ij')
+    return {name: m.ravel() for name, m in zip(values, mesh)}
+
+
+def _chunk_path(path, index):
+    return os.path.join(path, f'chunk_{index:06d}.npz')
+
+
+def _save(file_name, arrays):
+    """write an npz file atomically, so a killed sweep leaves no partial
+    chunk behind"""
+    tmp = file_name + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, file_name)
+
+
+def _run_chunk(start, columns, curves):
+    """
+    Evaluate one chunk of cases: the scalar results of ground_curve_batch
+    and the curves of ground_curve, of which only those stored are
+    computed. The curves of all cases are stored back to back in name_x
+    and name_y; case i of the chunk owns the slice
+    name_offsets[i]:name_offsets[i + 1]. Cases for which ground_curve
+    fails are flagged in 'error' and have no curves.
+    """
+    n = len(columns['gamma'])
+    data = dict(columns)
+    data['case'] = np.arange(start, start + n)
+    results = ground_curve_batch(columns)
+    for name in results.dtype.names:
+        data[name] = results[name]
+
+    error = np.zeros(n, dtype=bool)
+    parts = {name: ([], [], [0]) for name in curves}
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore')
+        for i in range(n):
+            try:
+                result = ground_curve(**{name: v[i].item()
+                                         for name, v in columns.items()})
+                values = [getattr(result, name) for name in curves]
+            except (ArithmeticError, ValueError):
+                values = [None] * len(curves)
+                error[i] = True
+            for curve, (xs, ys, offsets) in zip(values, parts.values()):
+                if curve is not None:
+                    x, y = np.ravel(curve.x), np.ravel(curve.y)
+                else:
+                    # float32 does not widen 32 bit curves when concatenated
+                    x = y = np.empty(0, dtype=np.float32)
+                xs.append(x)
+                ys.append(y)
+                offsets.append(offsets[-1] + len(x))
+
+    data['error'] = error
+    for name, (xs, ys, offsets) in parts.items():
+        data[name + '_x'] = np.concatenate(xs)
+        data[name + '_y'] = np.concatenate(ys)
+        data[name + '_offsets'] = np.array(offsets)
+    return data
+
+
+def sweep(cases, path, chunk_size=500, max_workers=None, curves=CURVES,
+          progress=None):
+    """
+    Evaluate ground_curve for all cases on a process pool and stream the
+    results to path, one npz file per chunk of chunk_size cases.
+    cases       - input values as for Batch.ground_curve_batch (e.g. from
+                  grid or a DataFrame); missing parameters take the defaults
+    path        - directory of the results; a sweep found there is resumed,
+                  which requires the same cases
+    max_workers - number of processes, all cores by default
+    curves      - names of the curves (see CURVES) stored for every case
+    progress    - optional callable(done, total) called per finished chunk
+    Returns the file names of all chunks.
+    """
+    columns = _columns(cases, {})
+    n = len(columns['gamma'])
+    os.makedirs(path, exist_ok=True)
+
+    manifest = os.path.join(path, 'cases.npz')
+    if os.path.exists(manifest):
+        with np.load(manifest) as stored:
+            same = stored['chunk_size'] == chunk_size and all(
+                np.array_equal(stored[name], v)
+                for name, v in columns.items())
+        if not same:
+            raise ValueError(f'{path} holds a different sweep')
+    else:
+        _save(manifest, dict(columns, chunk_size=chunk_size))
+
+    n_chunks = -(-n // chunk_size)
+    pending = [i for i in range(n_chunks)
+               if not os.path.exists(_chunk_path(path, i))]
+    done = n_chunks - len(pending)
+    if progress is not None:
+        progress(done, n_chunks)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {}
+            for i in pending:
+                start, stop = i * chunk_size, min((i + 1) * chunk_size, n)
+                chunk = {name: v[start:stop] for name, v in columns.items()}
+                futures[pool.submit(_run_chunk, start, chunk,
+                                    tuple(curves))] = i
+            for future in as_completed(futures):
+                _save(_chunk_path(path, futures[future]), future.result())
+                done += 1
+                if progress is not None:
+                    progress(done, n_chunks)
+
+    return [_chunk_path(path, i) for i in range(n_chunks)]
+
+
+def load(path):
+    """
+    Read the finished chunks of a sweep into one dict of arrays: one entry
+    per case for the input values, 'case', the scalar results and 'error',
+    and name_x, name_y, name_offsets for every stored curve (see
+    _run_chunk). Chunks of an unfinished sweep are simply missing.
+    """
+    parts = {}
+    for file_name in sorted(glob.glob(os.path.join(path, 'chunk_*.npz'))):
+        with np.load(file_name) as chunk:
+            for name in chunk.files:
+                parts.setdefault(name, []).append(chunk[name])
+
+    data = {}
+    for name, arrays in parts.items():
+        if name.endswith('_offsets'):
+            # shift the offsets of every chunk behind those before it
+            shift = np.cumsum([0] + [a[-1] for a in arrays[:-1]])
+            data[name] = np.concatenate(
+                [arrays[0][:1]] + [a[1:] + s for a, s in zip(arrays, shift)])
+        else:
+            data[name] = np.concatenate(arrays)
+    return data
+
+
+def case_curve(data, name, i):
+    """curve name (x and y) of the i-th case of data loaded by load"""
+    start, stop = data[name + '_offsets'][i:i + 2]
+    return data[name + '_x'][start:stop], data[name + '_y'][start:stop]
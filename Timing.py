@@ -0,0 +1,110 @@
+"""
+Timing of the steps of a computation
+Code marks its steps with span(name). While a recording is active in the
+thread, every span records its wall time and the size of the arrays it
+returns; without one, span returns a shared object which does nothing, so
+instrumented code costs next to nothing.
+"""
+from collections import namedtuple
+from Cache import nbytes
+import contextlib
+import functools
+import threading
+import time
+
+
+Span = namedtuple('Span', 'name duration nbytes')
+# [s] - wall time, [bytes] - size of the arrays returned
+
+
+class _Local(threading.local):
+    spans = None  # of the recording of the thread
+
+
+_local = _Local()
+
+
+class _NoSpan:
+    """span outside a recording"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def returns(self, value):
+        return value
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'spans', 'start', 'nbytes')
+
+    def __init__(self, name, spans):
+        self.name = name
+        self.spans = spans
+        self.nbytes = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.spans.append(Span(self.name, time.perf_counter() - self.start,
+                               self.nbytes))
+        return False
+
+    def returns(self, value):
+        """value, whose arrays count as allocated by the span"""
+        self.nbytes += nbytes(value)
+        return value
+
+
+def span(name):
+    """
+    context manager recording the step name into the recording of the
+    thread, e.g.
+        with span('draw') as s:
+            fig = s.returns(draw(...))
+    """
+    spans = _local.spans
+    if spans is None:
+        return _NO_SPAN
+    return _Span(name, spans)
+
+
+@contextlib.contextmanager
+def recording():
+    """
+    collect the spans of the thread, in the order they end:
+        with recording() as spans:
+            ...
+    """
+    previous = _local.spans
+    _local.spans = spans = []
+    try:
+        yield spans
+    finally:
+        _local.spans = previous
+
+
+def timed(name, function):
+    """function recorded as the span name"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        spans = _local.spans
+        if spans is None:
+            return function(*args, **kwargs)
+        with _Span(name, spans) as s:
+            return s.returns(function(*args, **kwargs))
+    return wrapper
+
+
+def timed_stages(stages):
+    """stages (like Ground_Curve.STAGES) with every function recorded as
+    a span of the name of its stage"""
+    return {name: stage._replace(function=timed(name, stage.function))
+            for name, stage in stages.items()}
@@ -0,0 +1,241 @@
+"""
+Benchmarks of ground_curve, its stages, the intersection, the rate of flow,
+draw and the callback of the app
+Every benchmark runs for named sets of input values. Times are per call
+(median and minimum of repeated calls), memory is the peak of the Python
+and numpy allocations during one call (tracemalloc). The results are
+written as JSON and can be compared with a saved baseline:
+
+    python benchmarks/benchmark.py --output baseline.json
+    (change the code)
+    python benchmarks/benchmark.py --baseline baseline.json
+
+which lists every benchmark and exits with 1 if one got slower than the
+baseline by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+_tmp = tempfile.TemporaryDirectory()
+os.environ['GC_CACHE'] = os.path.join(_tmp.name, 'figures')
+# the figure cache of the app on disk, which the benchmarks clear
+os.environ['GC_METRICS'] = os.path.join(_tmp.name, 'metrics')
+# and its metrics, apart from those of a server running on the machine;
+# both are removed at exit
+
+import numpy as np  # noqa: E402
+import GC_dash  # noqa: E402
+from Batch import ground_curve_batch  # noqa: E402
+from Draw_graph import draw  # noqa: E402
+from Ground_Curve import STAGES, DEFAULTS, ground_curve  # noqa: E402
+from Intersection import intersection  # noqa: E402
+from Rate_of_Flow import rate_of_flow  # noqa: E402
+from Sweep import CURVES  # noqa: E402
+
+
+APP = dict(gamma=20, H=500, E=1050000, nu=0.3, D=5, c=1000, phi=28, f_ck=20,
+           E_c=5000, t_c=0.2, dis_sup=2, advance_rate=5)
+# initial slider values of the app
+
+CASES = {
+    'app': APP,
+    'no_intersection': dict(APP, t_c=0.05),
+    'cohesionless': dict(APP, H=1000, c=0),
+    'heavy': dict(APP, H=1000, c=3000, phi=45, t_c=1),
+}
+# named sets of input values: 'cohesionless' never reaches equilibrium
+# (unbounded plastic zone), 'heavy' builds a long LDP family (548 profiles)
+# and rate of flow (457 steps)
+
+SLIDERS = dict(gamma=(15, 30), H=(10, 1000), E=(1e4, 1.6e7), nu=(0.05, 0.49),
+               D=(3, 20), c=(0, 3000), phi=(15, 45), f_ck=(10, 40),
+               E_c=(5000, 35000), t_c=(0.05, 1), dis_sup=(0, 5),
+               advance_rate=(1, 10))
+# ranges of the random sweeps (those of the sliders, t_c > 0)
+
+SWEEP = 200
+# cases of the random sweep of ground_curve ...
+SWEEP_BATCH = 100000
+# ... and of ground_curve_batch
+
+MIN_TIME = 0.2
+# [s] - every benchmark repeats its call for at least this long ...
+MIN_REPEAT = 5
+# ... and at least this often
+
+
+def measure(function):
+    """median and minimum time per call [ms] and peak memory [kB]"""
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times = []
+    start = time.perf_counter()
+    while (len(times) < MIN_REPEAT
+           or time.perf_counter() - start < MIN_TIME):
+        t = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - t)
+    return {'median_ms': 1e3 * float(np.median(times)),
+            'min_ms': 1e3 * min(times), 'peak_kb': peak / 1024,
+            'repeat': len(times)}
+
+
+def _stage_results(values):
+    """results of all stages of ground_curve for the input values"""
+    values = dict(DEFAULTS, **values)
+    results = {}
+    for name, (function, parameters, upstream) in STAGES.items():
+        results[name] = function(**{p: values[p] for p in parameters},
+                                 **{up: results[up] for up in upstream})
+    return values, results
+
+
+def benchmarks(name, values):
+    """dict benchmark name -> function of the set of input values name"""
+    values, results = _stage_results(values)
+    functions = {}
+    for stage, (function, parameters, upstream) in STAGES.items():
+        functions[f'{name}/stage/{stage}'] = (
+            lambda function=function, parameters=parameters,
+            upstream=upstream: function(
+                **{p: values[p] for p in parameters},
+                **{up: results[up] for up in upstream}))
+
+    def full():
+        result = ground_curve(**values)
+        for curve in CURVES:
+            getattr(result, curve)
+    functions[f'{name}/ground_curve'] = full
+
+    ground, support = results['ground'], results['support']
+    functions[f'{name}/intersection'] = lambda: intersection(
+        ground.x, ground.p_i / 1000, support.x_support, support.y_support)
+
+    family = results['ldp_family']
+    if family is not None:
+        functions[f'{name}/rate_of_flow'] = lambda: rate_of_flow(
+            (family.x_l, family.y_l), values['advance_rate'])
+
+    app = {p: values[p] for p in APP}
+    arguments = GC_dash.draw_arguments(GC_dash.gc(**app, precision=32))
+    functions[f'{name}/draw'] = lambda: draw(**arguments)
+
+    slider_values = [app[p] for p in APP]
+
+    def callback_cold():
+        GC_dash.stages.clear()
+        GC_dash.figure.cache.clear()
+        GC_dash.update_output(None, *slider_values)
+    functions[f'{name}/update_output/cold'] = callback_cold
+    functions[f'{name}/update_output/warm'] = (
+        lambda: GC_dash.update_output(None, *slider_values))
+    return functions
+
+
+def _sweep_cases(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {p: rng.uniform(low, high, n) for p, (low, high) in SLIDERS.items()}
+
+
+def sweep_benchmarks():
+    """the random sweeps: per case of ground_curve and ground_curve_batch"""
+    cases = _sweep_cases(SWEEP)
+    rows = [{p: v[i].item() for p, v in cases.items()} for i in range(SWEEP)]
+
+    def sweep():
+        for row in rows:
+            result = ground_curve(**row)
+            for curve in CURVES:
+                getattr(result, curve)
+    batch = _sweep_cases(SWEEP_BATCH)
+    return {'sweep/ground_curve': (sweep, SWEEP),
+            'sweep/ground_curve_batch': (lambda: ground_curve_batch(batch),
+                                         SWEEP_BATCH)}
+
+
+def run(pattern=''):
+    """results of all benchmarks whose name contains pattern"""
+    results = {}
+    functions = {}
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore')
+        for name, values in CASES.items():
+            functions.update({key: (f, 1) for key, f in
+                              benchmarks(name, values).items()})
+        functions.update(sweep_benchmarks())
+        for key, (function, n) in functions.items():
+            if pattern in key:
+                result = measure(function)
+                if n > 1:
+                    result['cases'] = n
+                    result['per_case_us'] = 1e3 * result['median_ms'] / n
+                results[key] = result
+                print(f'{key:42s} {result["median_ms"]:10.3f} ms '
+                      f'{result["peak_kb"]:10.0f} kB', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """names of the benchmarks slower than baseline by more than
+    threshold (relative, of the median time)"""
+    slower = []
+    print(f'\n{"benchmark":42s} {"baseline":>10s} {"now":>10s} '
+          f'{"ratio":>6s}')
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before, now = baseline[key]['median_ms'], result['median_ms']
+        ratio = now / before
+        flag = ''
+        if ratio > 1 + threshold:
+            slower.append(key)
+            flag = '  slower'
+        elif ratio < 1 / (1 + threshold):
+            flag = '  faster'
+        print(f'{key:42s} {before:10.3f} {now:10.3f} {ratio:6.2f}{flag}')
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--output', help='write the results to this file')
+    parser.add_argument('--baseline', help='compare with these results')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='largest relative slowdown (default 0.2)')
+    parser.add_argument('--filter', default='',
+                        help='run only benchmarks containing this')
+    args = parser.parse_args(argv)
+
+    results = run(args.filter)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'numpy': np.__version__,
+                       'machine': platform.platform(),
+                       'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'results': results}, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        slower = compare(results, baseline, args.threshold)
+        if slower:
+            print(f'\n{len(slower)} benchmarks slower than the baseline by '
+                  f'more than {args.threshold:.0%}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Regression check of the equilibrium points and the ground curve against
+the original code
+equilibrium() finds the points where the support lines meet the ground
+curve by root finding on its closed form. The original code intersected
+the support lines with the ground curve sampled at 5000 support pressures
+(Intersection.intersection); REFERENCE holds its results for fixed sets of
+input values, from which the closed form may only differ by the linear
+interpolation between those samples (RTOL). Without cohesion the ground
+curve must keep the plastic branch of the original code, from its first
+support pressure above zero down to the critical point:
+
+    python benchmarks/regression.py
+
+lists every case and exits with 1 if one deviates.
+"""
+import math
+import os
+import sys
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import numpy as np  # noqa: E402
+from Ground_Curve import equilibrium, ground_curve  # noqa: E402
+
+
+FIELDS = ('x_int', 'y_int', 'x_int_el', 'y_int_el', 'safety_factor')
+# results compared: [m], [MPa], [m], [MPa], [-]
+
+RTOL = 1e-5
+# [-] - largest relative deviation from the original code
+
+NONE = (None, None, None, None, 0)
+# the results if the support does not reach the ground curve
+
+REFERENCE = {
+    'default': (dict(), (
+        0.0135630255981, 0.274068011236, 0.0132487103313, 0.312800590953,
+        4.91047665645)),
+    'app': (dict(H=500), (
+        0.0532829686386, 0.755399793702, 0.0529959084774, 0.766277781787,
+        2.00449502323)),
+    'shallow': (dict(H=50, c=300, phi=35), (
+        0.00306773819542, 0.0508697723587, 0.00295145585339, 0.0737584515661,
+        20.8247321817)),
+    'weak': (dict(H=150, c=200, phi=20, t_c=0.3), (
+        0.0335931632769, 0.298515476425, 0.0331472587947, 0.303968078459,
+        7.42183196157)),
+    'late': (dict(H=300, c=500, dis_sup=5, t_c=0.3), (
+        0.0484128475194, 0.153547685761, 0.0480854744361, 0.159401481589,
+        14.152942479)),
+    'stiff': (dict(H=400, E=1.6e7, c=800, phi=30), (
+        0.00349901075883, 0.127576206198, 0.00337490887829, 0.175880776911,
+        8.73318862344)),
+    'support_at_face': (dict(dis_sup=0), (
+        0.0097461614358, 0.909577441614, 0.00971160613789, 0.91772417189,
+        1.67370550656)),
+    'heavy': (dict(H=1000, c=3000, phi=45, t_c=1), (
+        0.0567849149648, 2.12696950121, 0.0564641112184, 2.19008940493,
+        2.92225513059)),
+    'no_intersection': (dict(H=500, t_c=0.05), NONE),
+    'deep_support_at_face': (dict(H=500, dis_sup=0), NONE),
+    'elastic': (dict(H=100, c=3000, phi=40), NONE),
+    'cohesionless': (dict(H=1000, c=0), NONE),
+    'cohesionless_shallow': (dict(H=100, c=0, phi=40), NONE),
+    'cohesionless_thick': (dict(H=300, c=0, phi=45, t_c=0.5), NONE),
+}
+# name -> input values of equilibrium and the results of the original code
+# for them (NONE: no equilibrium; c = 0 never reaches one, the plastic zone
+# being unbounded without support)
+
+
+def _close(actual, expected):
+    if actual is None or expected is None:
+        return actual is expected
+    return math.isclose(actual, expected, rel_tol=RTOL)
+
+
+def check_equilibrium():
+    """names of the cases of REFERENCE where equilibrium deviates"""
+    failed = []
+    for name, (values, expected) in REFERENCE.items():
+        result = equilibrium(**values)
+        actual = tuple(None if value is None else float(value) for value
+                       in (getattr(result, field) for field in FIELDS))
+        ok = all(map(_close, actual, expected))
+        if not ok:
+            failed.append(name)
+        fs = result.safety_factor
+        print(f'{name:24s} F.S. {fs:10.6f} '
+              f'{"ok" if ok else f"expected {expected}, got {actual}"}')
+    return failed
+
+
+def check_ground():
+    """names of the cases of REFERENCE without cohesion whose ground curve
+    lacks the plastic branch of the original code"""
+    failed = []
+    for name, (values, _) in REFERENCE.items():
+        if values.get('c', 1000) != 0:
+            continue
+        result = ground_curve(**values)
+        x = result.ground_curve.x
+        x = x[np.isfinite(x)]
+        x_first = ground_curve(tolerance=0, **values).ground_curve.x[1]
+        # [m] - displacement at the first support pressure above zero
+        ok = (np.count_nonzero(x > result.x_cr) > 1
+              and math.isclose(x.max(), x_first, rel_tol=RTOL))
+        if not ok:
+            failed.append(name)
+        print(f'{name:24s} {len(x):5d} points {x.max():10.4f} m '
+              f'{"ok" if ok else f"expected up to {x_first:.4f} m"}')
+    return failed
+
+
+def main():
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore')
+        failed = check_equilibrium() + check_ground()
+    if failed:
+        print(f'\n{len(failed)} cases deviate from the original code: '
+              f'{", ".join(failed)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())